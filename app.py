@@ -11,6 +11,7 @@ import time
 import os
 import re
 import datetime
+import hashlib
 from dotenv import load_dotenv
 
 # Charge les variables d'environnement
@@ -21,18 +22,28 @@ from core.config import Config
 from core.auth_manager import AuthManager
 from core.subscription_manager import SubscriptionManager
 from services.ia_service import IAService
+from services.answer_cache import get_answer_cache
+from services.retrieval import get_retrieval_orchestrator
+from services.context_packer import pack_context
+from services.query_router import RouteDecision, route_query
+from services.lexical_index import extract_article_ids
+from services.followup import RetrievalMemory, follow_up_reason, rerank_for_follow_up
+from services.prompt_builder import build_chain, build_static_prefix, prompt_inputs
+from services.intent import INTENT_CALCULATION, classify_intent
+from services.llm_guard import LLMUnavailable, get_generation_guard
+from services.single_flight import flight_key, get_single_flight
 from services.document_service import DocumentService
 from services.quota_service import QuotaService
 from services.export_service import ExportService
 from services.legal_watch import show_legal_watch_bar
 from ui.styles import apply_pro_design
 from ui.components import UIComponents
+from ui.streaming import StreamRenderer
 from utils.helpers import clean_source_name, logger, sanitize_user_input
 
 # --- IMPORTS MOTEUR & IA ---
-from rules.engine import SocialRuleEngine
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from rules.registry import get_rule_registry
+from rules.calculators import process_workforce_csv
 
 # ==============================================================================
 # 1. INITIALISATION & CONFIGURATION
@@ -43,9 +54,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# Constantes de configuration
-MAX_CONTEXT_CHARS = 10000  # ~2500 tokens pour Gemini
-
 # Initialisation du session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -57,13 +65,15 @@ if "services_ready" not in st.session_state:
     st.session_state.config = Config()
     st.session_state.auth_manager = AuthManager()
     st.session_state.sub_manager = SubscriptionManager()
-    st.session_state.ia_service = IAService()
+    st.session_state.ia_service = IAService(st.session_state.config)
     st.session_state.export_service = ExportService()
     st.session_state.doc_service = DocumentService()
     st.session_state.quota_service = QuotaService()
-    st.session_state.rule_engine = SocialRuleEngine()
     st.session_state.services_ready = True
 
+# Moteur de règles partagé par toutes les sessions (rechargé à chaud si le YAML change)
+rule_registry = get_rule_registry(poll_interval=st.session_state.config.RULES_RELOAD_INTERVAL)
+
 apply_pro_design()
 
 # Raccourcis vers les services
@@ -71,7 +81,7 @@ auth = st.session_state.auth_manager
 ia = st.session_state.ia_service
 docs_srv = st.session_state.doc_service
 quota = st.session_state.quota_service
-engine = st.session_state.rule_engine
+engine = rule_registry.get()  # Snapshot conservé pendant toute l'exécution
 ui = UIComponents()
 
 
@@ -139,13 +149,14 @@ with col1:
     st.markdown('<div class="fake-upload-btn">Charger un document</div>', unsafe_allow_html=True)
     uploaded_file = st.file_uploader(
         "Upload",
-        type=["pdf", "txt"],
+        type=["pdf", "txt", "csv"],
         label_visibility="collapsed",
         key=f"uploader_{st.session_state.uploader_key}"
     )
 with col2:
     if st.button("Nouvelle session", use_container_width=True):
         st.session_state.messages = []
+        st.session_state.last_retrieval = None
         st.session_state.uploader_key += 1
         logger.info("Nouvelle session démarrée")
         st.rerun()
@@ -157,7 +168,26 @@ st.markdown(
 
 # Traitement du document uploadé
 user_doc_content = ""
-if uploaded_file:
+if uploaded_file and uploaded_file.name.lower().endswith(".csv"):
+    # Fichier salariés : calculs paie déterministes (barèmes YAML) en une passe
+    with st.spinner("Calculs paie en cours..."):
+        try:
+            csv_result, n_rows = process_workforce_csv(
+                engine.store,
+                uploaded_file.getvalue().decode("utf-8-sig")
+            )
+            st.download_button(
+                label=f"📊 Télécharger les calculs ({n_rows} salariés)",
+                data=csv_result.encode("utf-8-sig"),
+                file_name=f"Calculs_Paie_{datetime.datetime.now().strftime('%H%M')}.csv",
+                mime="text/csv",
+                key=f"btn_csv_{st.session_state.uploader_key}"
+            )
+            logger.info(f"CSV salariés calculé: {uploaded_file.name} ({n_rows} lignes)")
+        except Exception as e:
+            logger.error(f"Erreur calcul CSV: {e}", exc_info=True)
+            st.error(f"❌ Fichier CSV illisible : {e}")
+elif uploaded_file:
     with st.spinner("Lecture du document..."):
         user_doc_content = docs_srv.extract_text(uploaded_file)
         if user_doc_content:
@@ -247,175 +277,325 @@ if user_input:
         box = st.empty()
         
         # =================================================================
-        # MOTEUR DE RÈGLES YAML (V4.0)
+        # RÉPONSE INSTANTANÉE YAML (SANS PINECONE NI GEMINI)
+        # =================================================================
+        instant_rule = None
+        if st.session_state.config.INSTANT_ANSWERS_ENABLED and not user_doc_content:
+            instant_rule = engine.find_instant_rule(user_input)
+        
+        if instant_rule:
+            instant_answer = engine.format_instant_answer(instant_rule)
+            box.markdown(instant_answer)
+            
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": instant_answer,
+                "debug_data": [{
+                    "name": instant_rule.source or "Règle Officielle",
+                    "extract": instant_rule.text or ""
+                }]
+            })
+            
+            logger.info(f"Réponse instantanée YAML ({instant_rule.id})")
+            st.rerun()
+        
+        # =================================================================
+        # MOTEUR DE RÈGLES YAML (V4.0) + ROUTAGE DE LA RECHERCHE
         # =================================================================
+        config = st.session_state.config
         matched = engine.match_rules(user_input)
         
         # Log si aucune règle spécifique matchée (les vitales sont toujours là)
         if len(matched) <= 6:  # Seulement les règles vitales
             logger.info(f"Peu de règles matchées pour: {user_input[:50]}...")
         
-        facts = engine.format_certified_facts(matched)
-        
-        # =================================================================
-        # RECHERCHE DOCUMENTAIRE PINECONE
-        # =================================================================
-        docs = ia.search_documents(user_input, k=st.session_state.config.PINECONE_TOP_K)
-        
-        # Préparation du contexte avec limitation de taille
-        context_str = ""
-        seen = []
-        debug_data_list = []
-        context_truncated = False
+        # Partition de l'index à interroger (CODES / REF / DOC)
+        rule_sources = [
+            r.get("source", "") for r in matched
+            if r.get("id") not in engine.VITAL_RULE_IDS and r.get("source")
+        ]
+        route = RouteDecision((), "désactivé")
+        if config.ROUTING_ENABLED:
+            route = route_query(user_input, rule_sources)
         
-        for d in docs:
-            # Vérifier la limite de contexte
-            if len(context_str) > MAX_CONTEXT_CHARS:
-                context_truncated = True
-                logger.info(f"Contexte RAG tronqué à {MAX_CONTEXT_CHARS} caractères.")
-                break
-            
-            pname = d.metadata.get('clean_name', 'Source')
-            if pname not in seen:
-                seen.append(pname)
-                debug_data_list.append({
-                    "name": pname,
-                    "extract": d.page_content
-                })
-            
-            context_str += f"DOCUMENT : {pname}\n{d.page_content}\n\n"
+        # Articles cités (question d'abord, puis sources des règles) : lecture directe
+        cited_articles = []
+        if config.ARTICLE_LOOKUP_ENABLED:
+            for text in [user_input] + rule_sources:
+                cited_articles += [a for a in extract_article_ids(text) if a not in cited_articles]
         
-        # Debug Admin : affichage des sources en cours
-        if st.session_state.user_info.get("role") == "ADMIN" and docs:
-            with st.expander("🕵️‍♂️ SOURCES PINECONE (EN COURS)", expanded=True):
-                st.success(f"{len(docs)} documents trouvés.")
-                if context_truncated:
-                    st.warning(f"⚠️ Contexte tronqué ({MAX_CONTEXT_CHARS} caractères max)")
+        # Question de suivi : le contexte du tour précédent est re-classé au lieu
+        # d'interroger à nouveau Pinecone (lu ici : pas de session_state dans les threads)
+        previous_retrieval = st.session_state.get("last_retrieval") if config.FOLLOWUP_REUSE_ENABLED else None
+        # Règle décisive seulement (meilleur score hors vitales) : la fin de liste
+        # de match_rules est faite de correspondances faibles
+        specific_rule_ids = frozenset(
+            [r.get("id", "") for r in matched if r.get("id") not in engine.VITAL_RULE_IDS][:1]
+        )
         
         # =================================================================
-        # PROMPT EXPERT SOCIAL PRO 2026 - VERSION 4.0
+        # SINGLE-FLIGHT : MÊME QUESTION DÉJÀ EN COURS DANS UNE AUTRE SESSION
         # =================================================================
-        template = """Tu es l'Expert Social Pro 2026, spécialiste de l'audit paie et du droit social français.
-
-=== CONTEXTE TEMPOREL ===
-📅 Date du jour : {current_date}
-📅 Année de référence des barèmes : 2026
-
-=== RÈGLE ABSOLUE N°1 : HIÉRARCHIE DES SOURCES ===
-🚨 AVANT TOUTE RÉPONSE, LIS LES FAITS CERTIFIÉS CI-DESSOUS.
-🚨 LES CHIFFRES DU YAML ÉCRASENT TA CONNAISSANCE INTERNE ET LE CONTEXTE RAG.
-
-FAITS CERTIFIÉS (YAML - SOURCE PRIORITAIRE ABSOLUE) :
-{certified_facts}
-
-⚠️ EXEMPLES D'ARBITRAGE OBLIGATOIRES :
-- Forfait social rupture conventionnelle = 40,0% (YAML), PAS 20% (taux standard).
-- Télétravail 3 jours/semaine = 33,00 €/mois (11 € × 3), PAS un autre calcul.
-- SMIC 2026 = 1 823,03 €/mois, PAS une ancienne valeur.
-- Indemnité légale licenciement = 1/4 mois (0,2500) jusqu'à 10 ans, puis 1/3 (0,3333).
-
-=== RÈGLE ABSOLUE N°2 : MÉTHODE DE CALCUL AUDIT ===
-A. INTERDICTIONS FORMELLES :
-   ❌ Convertir les mois en années décimales (ex: écrire "2,75 ans" est INTERDIT).
-   ❌ Donner un résultat sans montrer chaque étape intermédiaire.
-   ❌ Arrondir les calculs intermédiaires à moins de 4 décimales.
-   ❌ Inventer des chiffres non présents dans les sources.
-
-B. MÉTHODE OBLIGATOIRE :
-   ✅ Ancienneté fractionnaire : 12 ans et 9 mois = 12 + (9/12).
-   ✅ Coefficients : Utilise 4 décimales avec arrondi rigoureux (ex: 1/3 = 0,3333 | 2,75/3 = 0,9167).
-   ✅ Résultat final : 2 décimales avec les deux zéros (ex: 15 000,00 EUR).
-
-C. EXCEPTION DE JUSTESSE (PRIORITÉ MAXIMALE) :
-   🎯 AVANT d'appliquer un coefficient (0,2500 ou 0,3333), VÉRIFIE si la division tombe juste :
-   - 4800 ÷ 4 = 1200 (JUSTE) → Utilise 1 200,00 EUR, PAS 4800 × 0,2500
-   - 4800 ÷ 3 = 1600 (JUSTE) → Utilise 1 600,00 EUR, PAS 4800 × 0,3333
-   - 5000 ÷ 3 = 1666,6667 (PAS JUSTE) → Utilise 5000 × 0,3333 = 1 666,50 EUR
-   
-D. EXEMPLE DE RÉFÉRENCE (PRÉCISION CHIRURGICALE) :
-   - Salaire : 4 800,00 EUR | Ancienneté : 12 ans et 9 mois
-   - Tranche 1 (10 ans) : 4800 ÷ 4 = 1200 (JUSTE) → 10 × 1 200 = 12 000,00 EUR
-   - Tranche 2 (2 ans 9 mois) : 4800 ÷ 3 = 1600 (JUSTE) → (2 + 9/12) × 1 600 = 2,75 × 1 600 = 4 400,00 EUR
-   - TOTAL : 12 000,00 + 4 400,00 = 16 400,00 EUR
-
-=== RÈGLE ABSOLUE N°3 : FORMAT DE RÉPONSE ===
-- Silence technique : Pas de politesses ("Bonjour", "Bien sûr", "Je vous en prie").
-- Markdown strict : ### Titres, **Gras**, - Listes.
-- Nomenclature des sources (OBLIGATOIRE après chaque chiffre) :
-  * BOSS -> (BOSS 2026 - [THÉMATIQUE])
-  * Code du Travail -> (Code du Travail Art. L1234-5)
-  * Code Sécurité Sociale -> (CSS Art. L136-8)
-  * YAML -> (Barème officiel 2026)
-
-=== CONTEXTE DOCUMENTAIRE (PRIORITÉ 2 - APRÈS YAML) ===
-{context}
-
-=== DOCUMENT UTILISATEUR (SI FOURNI) ===
-{user_doc_section}
-
-=== RAPPEL FINAL AVANT DE RÉPONDRE (VÉRIFICATION D'AUDIT) ===
-✅ TAUX/MONTANTS -> YAML uniquement (ignore ta mémoire interne).
-✅ ANCIENNETÉ -> Fractions (9/12), JAMAIS décimales (2,75).
-✅ COEFFICIENTS -> 4 décimales (0,9167) SAUF si division exacte (1600).
-✅ CITATIONS -> Chaque chiffre doit avoir sa source entre parenthèses.
-✅ SI AUCUNE INFO DISPONIBLE -> Dis clairement "Cette information n'est pas dans mes sources."
-
-QUESTION : {question}
-
-RÉPONDS STRICTEMENT SELON CE PLAN :
-### ANALYSE & RÈGLES
-[Explique les règles applicables avec leurs sources]
-
-### DÉTAIL & CHIFFRES
-[Montre chaque étape de calcul si nécessaire]
-
-### RÉSULTAT
-[Donne la réponse finale claire et concise]
-
-Sources utilisées : [Liste des sources entre parenthèses]
-"""
-        
-        prompt = ChatPromptTemplate.from_template(template)
-        chain = prompt | ia.get_llm() | StrOutputParser()
-        
-        full_response = ""
+        # Regroupées : questions sans document utilisateur ni contexte de suivi
+        flight = None
+        if config.SINGLE_FLIGHT_ENABLED and not user_doc_content and follow_up_reason(
+            previous_retrieval, user_input, specific_rule_ids,
+            max_age=config.FOLLOWUP_MAX_AGE, max_reuses=config.FOLLOWUP_MAX_REUSES
+        ) is None:
+            flight, leader = get_single_flight(config.SINGLE_FLIGHT_MAX_AGE).join(
+                flight_key(user_input, engine.version)
+            )
+            if leader:
+                # Réponse partagée : indépendante de l'historique de cette session
+                previous_retrieval = None
+            else:
+                shared = StreamRenderer(box, config.STREAM_RENDER_INTERVAL, config.STREAM_RENDER_MAX_CHARS)
+                try:
+                    for chunk in flight.subscribe(config.LLM_TOTAL_TIMEOUT):
+                        shared.write(chunk)
+                    shared_response = shared.finish()
+                except Exception as e:
+                    logger.warning(f"Single-flight: génération partagée indisponible ({e}), génération locale")
+                    shared_response = ""
+                if shared_response.strip():
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": shared_response,
+                        "debug_data": flight.debug_data
+                    })
+                    logger.info(f"Réponse partagée avec une génération en cours ({len(shared_response)} chars)")
+                    st.rerun()
+                # Échec du leader : cette session génère sa propre réponse
+                flight = None
         
         try:
-            # Streaming de la réponse
-            for chunk in chain.stream({
-                "context": context_str,
-                "question": user_input,
-                "certified_facts": facts,
-                "user_doc_section": user_doc_content if user_doc_content else "(Aucun document fourni)",
-                "current_date": datetime.datetime.now().strftime("%d/%m/%Y")
-            }):
-                full_response += chunk
-                box.markdown(full_response + "▌")
+            # =================================================================
+            # RECHERCHE EN PARALLÈLE : EMBEDDING, VERSION DE L'INDEX
+            # =================================================================
+            retrieval = get_retrieval_orchestrator(config.RETRIEVAL_WORKERS).start(config.RETRIEVAL_DEADLINE)
+            embedding_stage = retrieval.submit(
+                "embedding", lambda: ia.embed_query(user_input),
+                timeout=config.RETRIEVAL_STAGE_TIMEOUT
+            )
+            # Relue en arrière-plan : le cache des réponses utilise la dernière valeur connue
+            version_stage = retrieval.submit(
+                "index_version", lambda: ia.index_version(config.INDEX_VERSION_CHECK_INTERVAL),
+                timeout=config.INDEX_VERSION_TIMEOUT
+            )
             
-            # Affichage final
-            box.markdown(full_response)
+            # Question de suivi décidée avant le cache des réponses : une réponse
+            # bâtie sur le contexte de cette session ne passe pas par le cache partagé
+            thresholds = dict(
+                similarity_threshold=config.FOLLOWUP_SIMILARITY,
+                max_age=config.FOLLOWUP_MAX_AGE,
+                max_reuses=config.FOLLOWUP_MAX_REUSES
+            )
+            follow_up = follow_up_reason(previous_retrieval, user_input, specific_rule_ids, **thresholds)
+            if follow_up is None and previous_retrieval is not None:
+                follow_up = follow_up_reason(
+                    previous_retrieval, user_input, specific_rule_ids, embedding_stage.result(), **thresholds
+                )
             
-            # Sauvegarde persistante avec données de debug
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": full_response,
-                "debug_data": debug_data_list
-            })
+            def search_or_reuse():
+                if follow_up:
+                    return rerank_for_follow_up(previous_retrieval.docs, user_input)
+                return ia.search_documents(
+                    user_input, k=config.PINECONE_TOP_K,
+                    embedding=embedding_stage.result(), categories=route.categories,
+                    articles=cited_articles
+                )
             
-            logger.info(f"Réponse générée ({len(full_response)} chars)")
-            st.rerun()
-        
-        except Exception as e:
-            logger.error(f"IA Error: {e}", exc_info=True)
-            error_msg = (
-                "Désolé, une erreur technique est survenue. "
-                "Veuillez reformuler votre question ou réessayer dans quelques instants."
+            # Faits certifiés (pendant les appels réseau)
+            # (faits vitaux exclus : ils sont dans le préfixe statique du prompt)
+            facts = engine.format_certified_facts(matched, user_input, include_vital=False)
+            
+            # Intention de la demande : modules du prompt et plafond de sortie
+            intent = INTENT_CALCULATION
+            if config.INTENT_PROMPTS_ENABLED:
+                intent = classify_intent(user_input, bool(user_doc_content))
+            
+            # =================================================================
+            # CACHE DES RÉPONSES (QUESTION DÉJÀ TRAITÉE)
+            # =================================================================
+            answer_cache = get_answer_cache(
+                config.ANSWER_CACHE_TTL,
+                config.ANSWER_CACHE_MAX_ENTRIES,
+                config.ANSWER_CACHE_SIMILARITY
             )
-            box.error(error_msg)
+            rule_ids = [r.get("id", "") for r in matched]
+            doc_hash = hashlib.sha256(user_doc_content.encode("utf-8")).hexdigest() if user_doc_content else ""
+            # Dernière version connue de l'index (pas d'attente réseau) ; relue
+            # seulement à la première question du processus
+            index_version = ia.known_index_version()
+            if index_version is None:
+                index_version = version_stage.result()
+            cache_versions = (engine.version, index_version)
             
-            # Sauvegarde de l'erreur dans l'historique
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": error_msg,
-                "debug_data": []
-            })
\ No newline at end of file
+            # Version de l'index inconnue (hors délai) ou question de suivi : pas de cache
+            cached = None
+            if index_version and not follow_up:
+                cached = answer_cache.lookup(
+                    user_input, rule_ids, doc_hash, cache_versions,
+                    embed=embedding_stage.result
+                )
+            if cached:
+                box.markdown(cached.answer)
+                if flight is not None:
+                    flight.debug_data = cached.debug_data
+                    flight.publish(cached.answer)
+                    flight.finish()
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": cached.answer,
+                    "debug_data": cached.debug_data
+                })
+                logger.info(f"Réponse servie depuis le cache (similarité {cached.similarity:.3f})")
+                st.rerun()
+            
+            # =================================================================
+            # RECHERCHE DOCUMENTAIRE PINECONE (LANCÉE APRÈS UN DÉFAUT DE CACHE)
+            # =================================================================
+            docs_stage = retrieval.submit("pinecone", search_or_reuse, default=[])
+            docs = docs_stage.result()
+            if follow_up:
+                previous_retrieval.reuses += 1
+                logger.info(f"Question de suivi ({follow_up}) : contexte du tour précédent réutilisé")
+            elif docs:
+                st.session_state.last_retrieval = RetrievalMemory(
+                    query=user_input,
+                    embedding=embedding_stage.result(),
+                    docs=docs,
+                    rule_ids=specific_rule_ids
+                )
+            
+            # Préparation du contexte sous budget de tokens (fusion des recouvrements + MMR)
+            packed = pack_context(docs, config.MAX_CONTEXT_TOKENS, config.CONTEXT_MMR_LAMBDA)
+            context_str = packed.text
+            debug_data_list = packed.debug_data
+            if packed.truncated:
+                logger.info(f"Contexte RAG limité à {config.MAX_CONTEXT_TOKENS} tokens ({packed.pieces_used} extraits).")
+            
+            # Debug Admin : affichage des sources en cours
+            if st.session_state.user_info.get("role") == "ADMIN" and docs:
+                with st.expander("🕵️‍♂️ SOURCES PINECONE (EN COURS)", expanded=True):
+                    st.success(f"{len(docs)} documents trouvés.")
+                    st.caption(f"Routage : {', '.join(route.categories) or 'index complet'} ({route.reason})")
+                    if follow_up:
+                        st.caption(f"Suivi : contexte du tour précédent re-classé ({follow_up})")
+                    st.caption(
+                        f"Intention : {intent} (sortie max {config.INTENT_MAX_OUTPUT_TOKENS.get(intent)} tokens)"
+                    )
+                    direct = [d.metadata.get("article") for d in docs if d.metadata.get("match") == "article"]
+                    if cited_articles:
+                        st.caption(f"Articles cités : {', '.join(cited_articles)} ({len(direct)} chunks lus directement)")
+                    st.caption("Recherche : " + " | ".join(
+                        f"{name} {timing}" for name, timing in retrieval.timings().items()
+                    ))
+                    cache_stats = ia.embedding_cache_stats()
+                    st.caption(
+                        f"Cache embeddings : {cache_stats['hit_rate']:.0%} de hits "
+                        f"({cache_stats['memory_hits']} mémoire / {cache_stats['disk_hits']} disque / "
+                        f"{cache_stats['misses']} appels Gemini)"
+                    )
+                    answer_stats = answer_cache.stats()
+                    st.caption(
+                        f"Cache réponses : {answer_stats['hit_rate']:.0%} de hits "
+                        f"({answer_stats['exact_hits']} exacts / {answer_stats['similar_hits']} similaires, "
+                        f"{answer_stats['entries']} réponses gardées)"
+                    )
+                    st.caption(
+                        f"Contexte : {packed.chunks_in} chunks -> {packed.pieces_used} extraits, "
+                        f"~{packed.tokens} tokens"
+                    )
+                    if packed.truncated:
+                        st.warning(f"⚠️ Contexte limité ({config.MAX_CONTEXT_TOKENS} tokens max)")
+            
+            # =================================================================
+            # PROMPT EXPERT SOCIAL PRO 2026 : PRÉFIXE STATIQUE + SUFFIXE PAR REQUÊTE
+            # =================================================================
+            static_prefix = build_static_prefix(engine.format_vital_facts(), intent)
+            request_values = dict(
+                context=context_str,
+                question=user_input,
+                certified_facts=facts,
+                user_doc_section=user_doc_content if user_doc_content else "(Aucun document fourni)",
+                current_date=datetime.datetime.now().strftime("%d/%m/%Y")
+            )
+            
+            def generation(fallback):
+                """Stream d'un modèle (principal ou secours), même prompt"""
+                def start():
+                    chain = build_chain(ia.get_llm(fallback), intent, config.INTENT_MAX_OUTPUT_TOKENS.get(intent))
+                    return chain.stream(prompt_inputs(static_prefix, **request_values))
+                return start
+            
+            # Principal puis secours : délais, couverture et disjoncteurs partagés
+            attempts = [(config.GEMINI_MODEL, generation(False))]
+            if config.LLM_FALLBACK_MODEL:
+                attempts.append((config.LLM_FALLBACK_MODEL, generation(True)))
+            guard = get_generation_guard(
+                config.LLM_TTFT_TIMEOUT, config.LLM_TOTAL_TIMEOUT, config.LLM_HEDGE_ENABLED,
+                config.LLM_BREAKER_THRESHOLD, config.LLM_BREAKER_COOLDOWN
+            )
+            
+            # Rendu regroupé par frame (pas un re-rendu complet du Markdown par chunk)
+            renderer = StreamRenderer(box, config.STREAM_RENDER_INTERVAL, config.STREAM_RENDER_MAX_CHARS)
+            
+            try:
+                # Streaming de la réponse
+                stream = guard.stream(attempts)
+                if flight is not None:
+                    # Leader : chaque chunk est aussi diffusé aux sessions abonnées
+                    flight.debug_data = debug_data_list
+                    stream = flight.relay(stream)
+                for chunk in stream:
+                    renderer.write(chunk)
+                
+                # Affichage final (toujours rendu, même si la dernière frame est récente)
+                full_response = renderer.finish()
+                
+                # Sauvegarde persistante avec données de debug
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": full_response,
+                    "debug_data": debug_data_list
+                })
+                
+                logger.info(f"Réponse générée ({len(full_response)} chars)")
+                
+                # Mise en cache pour les prochaines questions identiques
+                # (sous la version de l'index relue pendant la recherche)
+                store_versions = (engine.version, version_stage.result())
+                if full_response.strip() and store_versions[1] and not follow_up:
+                    question_vector = embedding_stage.result() if answer_cache.similarity_enabled else None
+                    answer_cache.store(
+                        user_input, rule_ids, doc_hash, store_versions,
+                        full_response, debug_data_list, question_vector
+                    )
+                st.rerun()
+            
+            except Exception as e:
+                logger.error(f"IA Error: {e}", exc_info=True)
+                if flight is not None:
+                    flight.finish(e)  # Abonnés libérés (sans effet si le relais l'a déjà fait)
+                if not isinstance(e, LLMUnavailable):
+                    ia.reset_llm()  # Client Gemini reconstruit à la prochaine question
+                error_msg = (
+                    "Désolé, une erreur technique est survenue. "
+                    "Veuillez reformuler votre question ou réessayer dans quelques instants."
+                )
+                # Réponse partielle gardée à l'écran ; rien n'est ajouté à l'historique
+                # (ni erreur, ni réponse tronquée) : la question peut être renvoyée
+                partial = renderer.text
+                if partial:
+                    box.markdown(partial + "\n\n---\n⚠️ Réponse interrompue. " + error_msg)
+                else:
+                    box.error(error_msg)
+        
+        except BaseException as e:
+            # Leader interrompu avant la fin du relais (erreur de préparation,
+            # arrêt ou st.rerun de Streamlit) : le vol est clos pour que les
+            # sessions abonnées génèrent elles-mêmes au lieu d'attendre l'échéance
+            if flight is not None:
+                flight.finish(e)
+            raise
@@ -39,11 +39,60 @@ class Config:
         # =====================================================================
         # 4. PARAMÈTRES TECHNIQUES (AUDIT V4.0)
         # =====================================================================
-        self.PINECONE_TOP_K = 8              # Nombre de documents RAG (augmenté de 6 à 8)
+        self.PINECONE_TOP_K = 6              # Nombre de documents RAG (recherche hybride : 8 -> 6)
         self.RSS_TIMEOUT = 30                # Timeout Cloud Run (secondes)
         self.RATE_LIMIT_DELAY = 2.0          # Anti-Spam (secondes entre requêtes)
         self.MAX_INPUT_LENGTH = 5000         # Longueur max input utilisateur
-        self.MAX_CONTEXT_CHARS = 10000       # Limite contexte RAG (~2500 tokens)
+        self.MAX_CONTEXT_TOKENS = 2500       # Budget du contexte RAG (~10 000 caractères)
+        self.CONTEXT_MMR_LAMBDA = 0.7        # Pertinence vs diversité des extraits (MMR)
+        self.RULES_RELOAD_INTERVAL = 5.0     # Surveillance du YAML des règles (secondes)
+        self.INSTANT_ANSWERS_ENABLED = True  # Réponse directe YAML pour les questions de barème
+        self.EMBEDDING_CACHE_DIR = "cache/embeddings"  # Cache disque des embeddings de requêtes
+        self.EMBEDDING_CACHE_SIZE = 2048     # Vecteurs gardés en mémoire (LRU)
+        self.ANSWER_CACHE_TTL = 21600        # Durée de vie d'une réponse en cache (secondes)
+        self.ANSWER_CACHE_MAX_ENTRIES = 1000 # Réponses gardées en mémoire (LRU)
+        self.ANSWER_CACHE_SIMILARITY = 0.97  # Seuil cosinus des quasi-doublons (None = désactivé)
+        self.INDEX_VERSION_CHECK_INTERVAL = 300  # Relecture de la version Pinecone (secondes)
+        self.RETRIEVAL_WORKERS = 8           # Threads partagés des étapes de recherche
+        self.RETRIEVAL_DEADLINE = 4.0        # Échéance globale de la recherche (secondes)
+        self.RETRIEVAL_STAGE_TIMEOUT = 2.5   # Délai de l'embedding de la question (secondes)
+        self.INDEX_VERSION_TIMEOUT = 1.0     # Délai de lecture de la version Pinecone (secondes)
+        self.VECTOR_BACKEND = "pinecone"     # "pinecone" ou "local" (index NumPy exporté)
+        self.LOCAL_INDEX_DIR = "local_index/expert-social"  # Export de scripts/rebuild_base.py
+        self.LOCAL_INDEX_FALLBACK = True     # Index local si Pinecone est indisponible
+        self.HYBRID_SEARCH_ENABLED = True    # BM25 + vectoriel fusionnés (RRF) si l'export local existe
+        self.HYBRID_CANDIDATES = 20          # Candidats de chaque classement avant fusion
+        self.RRF_K = 60                      # Constante de la Reciprocal Rank Fusion
+        self.RETRIEVAL_ADAPTIVE_K = True     # Top-k selon les scores (PINECONE_TOP_K = maximum)
+        self.RETRIEVAL_BASE_K = 4            # k par défaut (monté au max si sources dispersées)
+        self.RETRIEVAL_MIN_SCORE = 0.55      # Similarité cosinus minimale (calibrée hors ligne)
+        self.RETRIEVAL_MAX_SCORE_DROP = 0.12 # Écart maximal avec le meilleur résultat
+        self.RETRIEVAL_MAX_SCORE_GAP = 0.06  # Décrochage maximal entre deux résultats consécutifs
+        self.RETRIEVAL_SPREAD_SOURCES = 3    # Sources distinctes dans le top pour monter k
+        self.ROUTING_ENABLED = True          # Recherche limitée aux catégories utiles (CODES/REF/DOC)
+        self.ROUTING_MIN_RESULTS = 2         # En dessous : repli sur l'index complet
+        self.ARTICLE_LOOKUP_ENABLED = True   # Articles cités (question, sources YAML) lus directement
+        self.ARTICLE_LOOKUP_MAX = 3          # Chunks d'articles ajoutés avant la recherche sémantique
+        self.FOLLOWUP_REUSE_ENABLED = True   # Question de suivi : contexte du tour précédent re-classé
+        self.FOLLOWUP_SIMILARITY = 0.85      # Similarité cosinus minimale avec la question d'origine
+        self.FOLLOWUP_MAX_AGE = 900          # Âge maximal du contexte réutilisé (secondes)
+        self.FOLLOWUP_MAX_REUSES = 3         # Tours de suivi avant une nouvelle recherche
+        self.INTENT_PROMPTS_ENABLED = True   # Modules du prompt selon l'intention (calcul, règle...)
+        self.INTENT_MAX_OUTPUT_TOKENS = {    # Plafond de tokens générés par intention
+            "calcul": 2048,
+            "regle": 1024,
+            "courrier": 1536,
+            "audit": 3072,
+        }
+        self.STREAM_RENDER_INTERVAL = 0.08   # Délai minimal entre deux rendus de la réponse (secondes)
+        self.STREAM_RENDER_MAX_CHARS = 400   # Caractères reçus qui forcent un rendu
+        self.LLM_TTFT_TIMEOUT = 8.0          # Délai du premier token avant requête de couverture (secondes)
+        self.LLM_TOTAL_TIMEOUT = 90.0        # Échéance globale de la génération (secondes)
+        self.LLM_HEDGE_ENABLED = True        # Requête identique relancée si le premier token tarde
+        self.LLM_BREAKER_THRESHOLD = 3       # Échecs consécutifs qui ouvrent le disjoncteur d'un modèle
+        self.LLM_BREAKER_COOLDOWN = 30.0     # Durée d'ouverture du disjoncteur (secondes)
+        self.SINGLE_FLIGHT_ENABLED = True    # Questions identiques simultanées : une seule génération
+        self.SINGLE_FLIGHT_MAX_AGE = 120     # Génération en cours considérée perdue au-delà (secondes)
         
         # =====================================================================
         # 5. MODÈLES IA
@@ -51,6 +100,7 @@ class Config:
         self.GEMINI_MODEL = "gemini-2.0-flash"
         self.EMBEDDING_MODEL = "models/gemini-embedding-001"
         self.LLM_TEMPERATURE = 0             # Déterministe pour l'audit
+        self.LLM_FALLBACK_MODEL = "gemini-2.0-flash-lite"  # Secours si le modèle principal échoue
 
         # =====================================================================
         # 6. VALIDATION
@@ -0,0 +1,152 @@
+"""
+==============================================================================
+BM25 INDEX - SCORING PONDÉRÉ DES RÈGLES YAML
+VERSION : 4.1 (MATRICE CREUSE TERMES × RÈGLES + NUMPY)
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import math
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from rules.sparse import accumulate, build_csr, gather_rows
+
+
+class BM25Index:
+    """
+    Index BM25 sur les keywords et le texte des règles.
+    Les poids BM25 de chaque couple (terme, règle) sont précalculés dans une
+    matrice creuse au format CSR (une ligne par terme) : scorer une requête
+    revient à sommer quelques lignes, sans parcourir les règles.
+    Les termes rares ("apld", "ppv") pèsent plus que les termes fréquents
+    ("taux", "mensuel", "horaire").
+    """
+
+    # Paramètres BM25 standards
+    K1 = 1.2
+    B = 0.75
+
+    # Un keyword compte comme plusieurs occurrences dans le texte
+    KEYWORD_BOOST = 2
+
+    def __init__(self, documents: Sequence[Tuple[int, Sequence[str], Sequence[str]]]):
+        """
+        Précalcule la matrice termes × règles.
+
+        Args:
+            documents: Triplets (position de la règle, tokens des keywords,
+                tokens du texte), dans l'ordre du YAML
+        """
+        self.doc_ids = np.array([doc_id for doc_id, _, _ in documents], dtype=np.int32)
+        n_docs = len(documents)
+
+        # 1. Fréquences par document
+        term_freqs: List[Dict[str, int]] = []
+        doc_lengths = np.zeros(n_docs, dtype=np.float32)
+        doc_freq: Dict[str, int] = {}
+
+        for pos, (_, kw_tokens, text_tokens) in enumerate(documents):
+            tf: Dict[str, int] = {}
+            for token in kw_tokens:
+                tf[token] = tf.get(token, 0) + self.KEYWORD_BOOST
+            for token in text_tokens:
+                tf[token] = tf.get(token, 0) + 1
+            term_freqs.append(tf)
+            doc_lengths[pos] = sum(tf.values())
+            for token in tf:
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+
+        avg_length = float(doc_lengths.mean()) if n_docs else 0.0
+
+        # 2. Matrice CSR : ligne = terme, colonnes = positions des règles
+        self.vocabulary: Dict[str, int] = {term: i for i, term in enumerate(doc_freq)}
+        rows: List[List[int]] = [[] for _ in self.vocabulary]
+        weights: List[List[float]] = [[] for _ in self.vocabulary]
+
+        for pos, tf in enumerate(term_freqs):
+            norm = self.K1 * (1 - self.B + self.B * doc_lengths[pos] / avg_length) if avg_length else self.K1
+            for term, freq in tf.items():
+                df = doc_freq[term]
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                term_id = self.vocabulary[term]
+                rows[term_id].append(pos)
+                weights[term_id].append(idf * freq * (self.K1 + 1) / (freq + norm))
+
+        self.indptr, self.indices, self.data = build_csr(rows, weights)
+        self.n_docs = n_docs
+
+    @classmethod
+    def from_arrays(cls, doc_ids: np.ndarray, vocabulary: Sequence[str], indptr: np.ndarray,
+                    indices: np.ndarray, data: np.ndarray) -> "BM25Index":
+        """
+        Recrée un index exporté sans recalculer les poids.
+
+        Args:
+            doc_ids: Positions des documents indexés
+            vocabulary: Termes, dans l'ordre des lignes de la matrice
+            indptr, indices, data: Matrice CSR termes × documents
+        """
+        index = cls.__new__(cls)
+        index.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        index.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        index.indptr, index.indices, index.data = indptr, indices, data
+        index.n_docs = int(index.doc_ids.size)
+        return index
+
+    def term_ids(self, tokens: Sequence[str]) -> np.ndarray:
+        """Identifiants (uniques, triés) des tokens connus du vocabulaire."""
+        vocabulary = self.vocabulary
+        return np.array(sorted({vocabulary[t] for t in tokens if t in vocabulary}), dtype=np.int64)
+
+    def scores(self, tokens: Sequence[str]) -> np.ndarray:
+        """
+        Score BM25 de chaque règle indexée pour une requête.
+
+        Args:
+            tokens: Tokens normalisés de la requête
+
+        Returns:
+            Vecteur float32 de taille n_docs (positions de l'index)
+        """
+        return self.scores_batch([tokens])[0]
+
+    def scores_batch(self, token_lists: Sequence[Sequence[str]]) -> np.ndarray:
+        """
+        Scores BM25 d'un lot de requêtes, en une seule opération matricielle.
+
+        Args:
+            token_lists: Tokens normalisés de chaque requête
+
+        Returns:
+            Matrice float32 (requêtes × n_docs)
+        """
+        term_lists = [self.term_ids(tokens) for tokens in token_lists]
+        row_ids = np.concatenate(term_lists) if term_lists else np.zeros(0, dtype=np.int64)
+        owners = np.repeat(np.arange(len(term_lists)), [t.size for t in term_lists])
+        out_rows, cols, values = gather_rows(
+            self.indptr, self.indices, self.data,
+            row_ids, owners, np.ones(row_ids.size, dtype=np.float32)
+        )
+        return accumulate(out_rows, cols, values, len(term_lists), self.n_docs)
+
+    def rank(self, tokens: Sequence[str], min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        Classe les règles par score BM25 décroissant.
+
+        Args:
+            tokens: Tokens normalisés de la requête
+            min_score: Score minimum (strictement positif dans tous les cas)
+
+        Returns:
+            Couples (position de la règle dans le store, score), ordre du YAML
+            en cas d'égalité
+        """
+        return self.rank_scores(self.scores(tokens), min_score)
+
+    def rank_scores(self, scores: np.ndarray, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Classe un vecteur de scores issu de scores() ou scores_batch()."""
+        candidates = np.flatnonzero((scores > 0) & (scores >= min_score))
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(self.doc_ids[pos]), float(scores[pos])) for pos in order]
@@ -0,0 +1,403 @@
+"""
+==============================================================================
+CALCULATEURS PAIE - CALCULS DÉTERMINISTES À PARTIR DES VALEURS YAML
+VERSION : 4.1 (VECTORISÉS NUMPY : 1 SALARIÉ OU UN FICHIER CSV ENTIER)
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import csv
+import io
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from rules.store import RuleStore
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+# Identifiants des règles YAML utilisées
+LICENCIEMENT_RULE = "INDEMNITE_LICENCIEMENT_LEGALE_2026"
+TELETRAVAIL_RULE = "FRAIS_TELETRAVAIL_2026"
+REPAS_RULE = "AVN_REPAS_2026"
+LOGEMENT_RULE = "AVN_LOGEMENT_2026"
+IK_VELO_RULE = "IK_VELO_2026"
+PASS_RULE = "PASS_2026"
+
+# Seuil de changement de tranche de l'indemnité légale (années)
+LICENCIEMENT_SEUIL_ANNEES = 10
+
+
+def _round_cents(values: np.ndarray) -> np.ndarray:
+    """Arrondi commercial au centime (0,005 -> 0,01), pas l'arrondi bancaire."""
+    return np.floor(np.asarray(values, dtype=np.float64) * 100 + 0.5) / 100
+
+
+def _part_de_salaire(salaire: np.ndarray, taux: float) -> np.ndarray:
+    """
+    Fraction de salaire (1/4, 1/3) avec l'exception de justesse : quotient
+    exact si la division tombe juste au centime, sinon coefficient à 4 décimales.
+    """
+    diviseur = int(round(1 / taux))
+    with np.errstate(invalid="ignore"):
+        cents = np.rint(np.nan_to_num(salaire) * 100).astype(np.int64)
+    return np.where(cents % diviseur == 0, salaire / diviseur, salaire * taux)
+
+
+# ==============================================================================
+# CALCULATEURS UNITAIRES (SCALAIRES OU TABLEAUX)
+# ==============================================================================
+def indemnite_licenciement(store: RuleStore, salaire_reference: ArrayLike,
+                           anciennete_mois: ArrayLike) -> np.ndarray:
+    """
+    Indemnité légale de licenciement (Art. R1234-2).
+
+    Args:
+        store: Règles du snapshot courant
+        salaire_reference: Salaire mensuel brut de référence
+        anciennete_mois: Ancienneté totale en mois
+
+    Returns:
+        Montants arrondis au centime (0 si ancienneté insuffisante)
+    """
+    salaire = np.asarray(salaire_reference, dtype=np.float64)
+    mois = np.asarray(anciennete_mois, dtype=np.float64)
+
+    taux_1 = store.number(f"{LICENCIEMENT_RULE}.taux_0_10_ans_part")
+    taux_2 = store.number(f"{LICENCIEMENT_RULE}.taux_au_dela_10_ans_part")
+    minimum = store.number(f"{LICENCIEMENT_RULE}.anciennete_minimum_mois")
+
+    # Ancienneté fractionnaire : années + mois/12, jamais convertie avant le calcul
+    annees = mois / 12
+    tranche_1 = np.minimum(annees, LICENCIEMENT_SEUIL_ANNEES) * _part_de_salaire(salaire, taux_1)
+    tranche_2 = np.maximum(annees - LICENCIEMENT_SEUIL_ANNEES, 0) * _part_de_salaire(salaire, taux_2)
+
+    montant = np.where(mois >= minimum, _round_cents(tranche_1 + tranche_2), 0.0)
+    return np.where(np.isnan(mois), np.nan, montant)
+
+
+def teletravail_forfait_mensuel(store: RuleStore, jours_par_semaine: ArrayLike) -> np.ndarray:
+    """Allocation forfaitaire mensuelle exonérée (11,00 € × jours par semaine)."""
+    jours = np.clip(np.asarray(jours_par_semaine, dtype=np.float64), 0, 5)
+    forfait = store.number(f"{TELETRAVAIL_RULE}.forfait_mensuel_par_jour_semaine")
+    return _round_cents(jours * forfait)
+
+
+def teletravail_journalier(store: RuleStore, jours_effectues: ArrayLike) -> np.ndarray:
+    """Allocation journalière exonérée (2,70 € par jour de télétravail effectué)."""
+    jours = np.maximum(np.asarray(jours_effectues, dtype=np.float64), 0)
+    return _round_cents(jours * store.number(f"{TELETRAVAIL_RULE}.par_jour"))
+
+
+def avantage_repas(store: RuleStore, nombre_repas: ArrayLike, hcr: ArrayLike = False) -> np.ndarray:
+    """Avantage en nature nourriture (forfait par repas, tarif HCR si applicable)."""
+    repas = np.maximum(np.asarray(nombre_repas, dtype=np.float64), 0)
+    tarif = np.where(
+        np.asarray(hcr, dtype=bool),
+        store.number(f"{REPAS_RULE}.hcr"),
+        store.number(f"{REPAS_RULE}.un_repas")
+    )
+    return _round_cents(repas * tarif)
+
+
+def avantage_logement(store: RuleStore, nombre_pieces: ArrayLike,
+                      salaire: Optional[ArrayLike] = None) -> np.ndarray:
+    """
+    Avantage en nature logement, barème forfaitaire mensuel (1re tranche).
+
+    Args:
+        store: Règles du snapshot courant
+        nombre_pieces: Nombre de pièces principales
+        salaire: Rémunération mensuelle ; au-delà de 0,5 PASS la tranche
+            n'est pas couverte par le YAML et le résultat vaut NaN
+
+    Returns:
+        Montants arrondis au centime
+    """
+    pieces = np.maximum(np.asarray(nombre_pieces, dtype=np.float64), 1)
+    montant = _round_cents(
+        store.number(f"{LOGEMENT_RULE}.forfait_1_piece")
+        + (pieces - 1) * store.number(f"{LOGEMENT_RULE}.forfait_par_piece_sup")
+    )
+    if salaire is None:
+        return montant
+
+    seuil = 0.5 * store.number(f"{PASS_RULE}.mensuel")
+    return np.where(np.asarray(salaire, dtype=np.float64) < seuil, montant, np.nan)
+
+
+def ik_velo(store: RuleStore, km_annuels: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indemnité kilométrique vélo.
+
+    Returns:
+        Tuple (montant de l'indemnité, part exonérée dans la limite du plafond annuel)
+    """
+    km = np.maximum(np.asarray(km_annuels, dtype=np.float64), 0)
+    montant = _round_cents(km * store.number(f"{IK_VELO_RULE}.taux_km"))
+    return montant, np.minimum(montant, store.number(f"{IK_VELO_RULE}.plafond_annuel"))
+
+
+# ==============================================================================
+# TRAITEMENT PAR LOT (CSV RH)
+# ==============================================================================
+# Colonnes d'entrée reconnues dans le CSV
+CSV_INPUT_COLUMNS = (
+    "salaire_reference", "anciennete_mois", "jours_teletravail_semaine",
+    "jours_teletravail_effectues", "repas_mois", "hcr", "pieces_logement",
+    "km_velo_annuels"
+)
+
+
+def compute_workforce(store: RuleStore, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Applique tous les calculateurs dont les colonnes d'entrée sont présentes.
+
+    Args:
+        store: Règles du snapshot courant
+        columns: Colonnes numériques (une valeur par salarié)
+
+    Returns:
+        Colonnes de résultats
+    """
+    results: Dict[str, np.ndarray] = {}
+
+    if "salaire_reference" in columns and "anciennete_mois" in columns:
+        results["indemnite_licenciement"] = indemnite_licenciement(
+            store, columns["salaire_reference"], columns["anciennete_mois"]
+        )
+    if "jours_teletravail_semaine" in columns:
+        results["teletravail_forfait_mensuel"] = teletravail_forfait_mensuel(
+            store, columns["jours_teletravail_semaine"]
+        )
+    if "jours_teletravail_effectues" in columns:
+        results["teletravail_journalier"] = teletravail_journalier(
+            store, columns["jours_teletravail_effectues"]
+        )
+    if "repas_mois" in columns:
+        results["avantage_repas"] = avantage_repas(
+            store, columns["repas_mois"], columns.get("hcr", False)
+        )
+    if "pieces_logement" in columns:
+        results["avantage_logement"] = avantage_logement(
+            store, columns["pieces_logement"], columns.get("salaire_reference")
+        )
+    if "km_velo_annuels" in columns:
+        results["ik_velo"], results["ik_velo_exoneree"] = ik_velo(store, columns["km_velo_annuels"])
+
+    return results
+
+
+def _parse_number(value: str) -> float:
+    """Nombre au format français ou anglais ("4 800,50", "4800.5"), NaN si vide."""
+    value = (value or "").strip().replace("\u00a0", "").replace(" ", "").replace("€", "")
+    if not value:
+        return float("nan")
+    if value.lower() in ("oui", "true", "vrai", "x"):
+        return 1.0
+    if value.lower() in ("non", "false", "faux"):
+        return 0.0
+    try:
+        return float(value.replace(",", "."))
+    except ValueError:
+        return float("nan")
+
+
+class _ExcelFrench(csv.excel):
+    """Dialecte CSV d'Excel en français (séparateur point-virgule)."""
+    delimiter = ";"
+
+
+def process_workforce_csv(store: RuleStore, csv_text: str) -> Tuple[str, int]:
+    """
+    Calcule un fichier CSV de salariés en une seule passe vectorisée.
+
+    Args:
+        store: Règles du snapshot courant
+        csv_text: Contenu CSV (séparateur ";" ou ","), une ligne par salarié
+
+    Returns:
+        Tuple (CSV d'origine enrichi des colonnes calculées, nombre de lignes)
+    """
+    try:
+        dialect = csv.Sniffer().sniff(csv_text[:4096], delimiters=";,\t")
+    except csv.Error:
+        dialect = _ExcelFrench
+
+    reader = csv.DictReader(io.StringIO(csv_text), dialect=dialect)
+    rows: List[Dict[str, str]] = list(reader)
+    fieldnames: Sequence[str] = reader.fieldnames or []
+
+    columns = {
+        name: np.array([_parse_number(row.get(name, "")) for row in rows], dtype=np.float64)
+        for name in CSV_INPUT_COLUMNS if name in fieldnames
+    }
+    if "hcr" in columns:
+        columns["hcr"] = np.nan_to_num(columns["hcr"]) > 0
+
+    results = compute_workforce(store, columns)
+
+    # Virgule décimale sauf si la virgule est déjà le séparateur de colonnes
+    decimal_mark = "." if dialect.delimiter == "," else ","
+    output = io.StringIO()
+    writer = csv.writer(output, delimiter=dialect.delimiter, lineterminator="\n")
+    writer.writerow(list(fieldnames) + list(results))
+    for i, row in enumerate(rows):
+        computed = [
+            "" if np.isnan(values[i]) else f"{values[i]:.2f}".replace(".", decimal_mark)
+            for values in results.values()
+        ]
+        writer.writerow([row.get(name, "") for name in fieldnames] + computed)
+
+    return output.getvalue(), len(rows)
+
+
+# ==============================================================================
+# CALCULS CERTIFIÉS POUR UNE QUESTION
+# ==============================================================================
+# En dessous, un nombre proche du mot "salaire" n'est pas un salaire mensuel
+SALAIRE_MINIMUM_PLAUSIBLE = 100
+
+_NUMBER = r"(\d{1,3}(?:[ \u00a0.]\d{3})+|\d+)(?:[,.](\d{1,2}))?"
+_SALAIRE_RE = re.compile(r"(?:salaire|r[ée]mun[ée]ration|brut)\D{0,30}?" + _NUMBER + r"|" + _NUMBER + r"\s*(?:€|eur)", re.IGNORECASE)
+_ANCIENNETE_RE = re.compile(r"(\d+)\s*ans?(?:\s*(?:et)?\s*(\d+)\s*mois)?|(\d+)\s*mois", re.IGNORECASE)
+# Une durée n'est une ancienneté que si elle y est rattachée ("depuis 12 ans",
+# "ancienneté de 10 ans", "10 ans d'ancienneté") : "salarié de 45 ans" est un âge
+_ANCIENNETE_AVANT_RE = re.compile(r"(?:depuis|anciennet[ée])\s*(?:de|:)?\s*$", re.IGNORECASE)
+_ANCIENNETE_APRES_RE = re.compile(
+    r"^\s*(?:d['’]\s*anciennet[ée]|anciennet[ée]|de\s+(?:pr[ée]sence|service)|dans\s+l['’]\s*entreprise)",
+    re.IGNORECASE
+)
+_TELETRAVAIL_RE = re.compile(r"(\d)\s*j(?:ours?|\.)?[^\d]{0,20}?(?:par|/)\s*semaine", re.IGNORECASE)
+_REPAS_RE = re.compile(r"(\d+)\s*repas", re.IGNORECASE)
+_PIECES_RE = re.compile(r"(\d+)\s*pi[èe]ces?", re.IGNORECASE)
+_KM_RE = re.compile(r"(\d[\d \u00a0]*)\s*km", re.IGNORECASE)
+
+
+def _to_float(integer: str, decimals: Optional[str]) -> float:
+    integer = re.sub(r"[ \u00a0.]", "", integer)
+    return float(f"{integer}.{decimals}" if decimals else integer)
+
+
+def extract_parameters(query: str) -> Dict[str, float]:
+    """
+    Extrait de la question les paramètres chiffrés utiles aux calculateurs.
+
+    Args:
+        query: Question de l'utilisateur
+
+    Returns:
+        Paramètres trouvés (mêmes noms que les colonnes CSV)
+    """
+    params: Dict[str, float] = {}
+    if not query:
+        return params
+
+    for match in _SALAIRE_RE.finditer(query):
+        groups = match.groups()
+        integer, decimals = (groups[0], groups[1]) if groups[0] else (groups[2], groups[3])
+        montant = _to_float(integer, decimals)
+        # Écarte les petits nombres capturés par erreur ("salaire et 2 ans")
+        if montant >= SALAIRE_MINIMUM_PLAUSIBLE:
+            params["salaire_reference"] = montant
+            break
+
+    # Ancienneté : seule une durée explicitement rattachée est retenue ; sinon
+    # pas de paramètre (et donc pas de calcul certifié sur un âge ou un délai)
+    for match in _ANCIENNETE_RE.finditer(query):
+        if not (_ANCIENNETE_AVANT_RE.search(query[max(0, match.start() - 20):match.start()])
+                or _ANCIENNETE_APRES_RE.search(query[match.end():match.end() + 30])):
+            continue
+        annees, mois, mois_seuls = match.groups()
+        params["anciennete_mois"] = int(annees) * 12 + int(mois or 0) if annees else int(mois_seuls)
+        break
+
+    for key, pattern in (("jours_teletravail_semaine", _TELETRAVAIL_RE),
+                         ("repas_mois", _REPAS_RE),
+                         ("pieces_logement", _PIECES_RE),
+                         ("km_velo_annuels", _KM_RE)):
+        match = pattern.search(query)
+        if match:
+            params[key] = float(re.sub(r"[ \u00a0]", "", match.group(1)))
+
+    if re.search(r"\bhcr\b|h[ôo]tel|caf[ée]s?[- ]restaurants?", query, re.IGNORECASE):
+        params["hcr"] = 1.0
+
+    return params
+
+
+def _fmt(value: float) -> str:
+    """Montant à la française : 16 400,00."""
+    return f"{value:,.2f}".replace(",", " ").replace(".", ",")
+
+
+def certified_calculations(store: RuleStore, rule_ids: Sequence[str], query: str) -> List[str]:
+    """
+    Lignes de faits certifiés calculées pour une question unique, lorsque
+    la règle concernée est matchée et que les paramètres sont présents.
+
+    Args:
+        store: Règles du snapshot courant
+        rule_ids: IDs des règles matchées
+        query: Question de l'utilisateur
+
+    Returns:
+        Lignes "- CALCUL CERTIFIÉ : ..." prêtes pour le prompt
+    """
+    params = extract_parameters(query)
+    if not params:
+        return []
+
+    ids = set(rule_ids)
+    lines: List[str] = []
+
+    def source(rule_id: str) -> str:
+        rule = store.get(rule_id)
+        return (rule.source if rule and rule.source else "Barème officiel 2026").strip()
+
+    try:
+        if LICENCIEMENT_RULE in ids and "salaire_reference" in params and "anciennete_mois" in params:
+            mois = int(params["anciennete_mois"])
+            montant = float(indemnite_licenciement(store, params["salaire_reference"], mois))
+            lines.append(
+                f"- CALCUL CERTIFIÉ : Indemnité légale de licenciement pour un salaire de référence de "
+                f"{_fmt(params['salaire_reference'])} € et {mois // 12} ans et {mois % 12} mois d'ancienneté "
+                f"= {_fmt(montant)} € (Source : {source(LICENCIEMENT_RULE)})"
+            )
+
+        if TELETRAVAIL_RULE in ids and "jours_teletravail_semaine" in params:
+            jours = params["jours_teletravail_semaine"]
+            montant = float(teletravail_forfait_mensuel(store, jours))
+            lines.append(
+                f"- CALCUL CERTIFIÉ : Forfait télétravail exonéré pour {jours:g} jour(s) par semaine "
+                f"= {_fmt(montant)} €/mois (Source : {source(TELETRAVAIL_RULE)})"
+            )
+
+        if REPAS_RULE in ids and "repas_mois" in params:
+            hcr = bool(params.get("hcr"))
+            montant = float(avantage_repas(store, params["repas_mois"], hcr))
+            lines.append(
+                f"- CALCUL CERTIFIÉ : Avantage en nature nourriture pour {params['repas_mois']:g} repas"
+                f"{' (secteur HCR)' if hcr else ''} = {_fmt(montant)} € (Source : {source(REPAS_RULE)})"
+            )
+
+        if LOGEMENT_RULE in ids and "pieces_logement" in params:
+            montant = float(avantage_logement(store, params["pieces_logement"], params.get("salaire_reference")))
+            if not np.isnan(montant):
+                lines.append(
+                    f"- CALCUL CERTIFIÉ : Avantage en nature logement pour {params['pieces_logement']:g} pièce(s) "
+                    f"= {_fmt(montant)} €/mois (Source : {source(LOGEMENT_RULE)})"
+                )
+
+        if IK_VELO_RULE in ids and "km_velo_annuels" in params:
+            montant, exonere = ik_velo(store, params["km_velo_annuels"])
+            lines.append(
+                f"- CALCUL CERTIFIÉ : IK vélo pour {params['km_velo_annuels']:g} km = {_fmt(float(montant))} €, "
+                f"dont {_fmt(float(exonere))} € exonérés (Source : {source(IK_VELO_RULE)})"
+            )
+    except (KeyError, TypeError) as e:
+        # Valeur absente ou non numérique dans le YAML : pas de calcul certifié
+        print(f"⚠️ Calcul certifié impossible: {e}")
+
+    return lines
@@ -7,10 +7,77 @@ DATE : 08/02/2026
 """
 
 import yaml
+import functools
+import hashlib
+import json
 import os
 import re
+import sys
 import unicodedata
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Set, Tuple
+
+# Exécution directe (python rules/engine.py) : racine du projet dans le path,
+# comme les scripts de scripts/
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rules.bm25 import BM25Index
+from rules.calculators import certified_calculations
+from rules.matcher import KeywordMatcher
+from rules.sparse import top_k_rows
+from rules.store import Rule, RuleStore
+
+
+# Expressions compilées une fois pour la normalisation
+_SPECIAL_CHARS_RE = re.compile(r"[^a-z0-9\s]")
+_MULTI_SPACES_RE = re.compile(r"\s+")
+
+# Loader C (libyaml) si disponible, sinon loader pur Python
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Dossier des snapshots compilés (à côté du YAML)
+COMPILED_DIR_NAME = "__compiled__"
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise le texte pour le matching robuste.
+    Partagée avec les caches de services (embeddings, réponses) pour que
+    deux formulations équivalentes tombent sur la même clé.
+    - Mise en minuscules
+    - Suppression des accents
+    - Remplacement des tirets et apostrophes par des espaces
+    - Suppression des caractères spéciaux
+    
+    Args:
+        text: Texte à normaliser
+        
+    Returns:
+        Texte normalisé
+    """
+    if not text:
+        return ""
+    
+    # Minuscules
+    text = text.lower()
+    
+    # Suppression des accents (é -> e, ç -> c, etc.)
+    text = unicodedata.normalize('NFKD', text)
+    text = text.encode('ASCII', 'ignore').decode('ASCII')
+    
+    # Remplacement des séparateurs par des espaces
+    text = text.replace("-", " ")
+    text = text.replace("'", " ")
+    text = text.replace("'", " ")  # Apostrophe typographique
+    text = text.replace("_", " ")
+    
+    # Suppression des caractères spéciaux (garde lettres, chiffres, espaces)
+    text = _SPECIAL_CHARS_RE.sub(" ", text)
+    
+    # Normalisation des espaces multiples
+    text = _MULTI_SPACES_RE.sub(" ", text).strip()
+    
+    return text
 
 
 class SocialRuleEngine:
@@ -30,6 +97,36 @@ class SocialRuleEngine:
         "TAUX_COTISATIONS_2026"
     ]
     
+    # Modes de scoring disponibles pour match_rules()
+    SCORING_ADDITIVE = "additive"
+    SCORING_BM25 = "bm25"
+    
+    # Réponse instantanée (sans RAG ni LLM) : seuils de confiance du matching
+    INSTANT_MAX_TOKENS = 6       # Questions courtes uniquement (recherche de valeur)
+    INSTANT_MIN_SCORE = 6        # Score minimum de la meilleure règle
+    INSTANT_MIN_MARGIN = 3       # Écart minimum avec la deuxième règle
+    INSTANT_MIN_RATIO = 1.5      # Rapport minimum avec la deuxième règle
+    INSTANT_ID_TOKEN_WEIGHT = 3  # Bonus par token de la requête présent dans l'ID
+    
+    # Mots vides ignorés par le contrôle de couverture de la réponse instantanée
+    INSTANT_STOPWORDS = frozenset({
+        "le", "la", "les", "du", "de", "des", "un", "une", "au", "aux", "en", "et",
+        "quel", "quelle", "quels", "quelles", "est", "ce", "que", "qui", "pour",
+        "montant", "valeur", "actuel", "actuelle", "cette", "annee"
+    })
+    
+    # Intentions incompatibles avec une simple lecture du barème
+    INSTANT_BLOCKING_PREFIXES = (
+        "calcul", "combien", "simul", "redig", "lettre", "courrier", "modele",
+        "audit", "verif", "analys", "compar", "pourquoi", "comment"
+    )
+    
+    # Nombre de combinaisons de règles dont les faits rendus sont mis en cache
+    FACTS_CACHE_SIZE = 512
+    
+    # Version du format des snapshots compilés (à incrémenter si la structure change)
+    ARTIFACT_FORMAT = 3
+    
     def __init__(self, yaml_path: str = "rules/social_rules.yaml"):
         """
         Initialise le moteur de règles.
@@ -38,8 +135,12 @@ class SocialRuleEngine:
             yaml_path: Chemin vers le fichier YAML des règles
         """
         self.yaml_path = self._resolve_yaml_path(yaml_path)
-        self.rules: List[Dict] = self._load_rules()
+        self.version: str = ""  # Empreinte SHA-256 du YAML chargé
+        self.validation_report: Optional[Dict] = None
+        self.store: RuleStore = self._load_rules()
+        self.rules: Tuple[Rule, ...] = self.store.rules
         self._build_keyword_index()
+        self._build_facts_cache()
     
     def _resolve_yaml_path(self, yaml_path: str) -> str:
         """Résout le chemin du fichier YAML (local vs cloud)."""
@@ -59,74 +160,166 @@ class SocialRuleEngine:
         print(f"⚠️ Fichier YAML non trouvé: {yaml_path}")
         return yaml_path
     
-    def _load_rules(self) -> List[Dict]:
-        """Charge les règles depuis le fichier YAML."""
+    def _load_rules(self) -> RuleStore:
+        """
+        Charge les règles depuis le snapshot compilé correspondant au YAML,
+        ou compile le YAML si le snapshot est absent ou périmé.
+        """
         try:
-            with open(self.yaml_path, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
-                rules = data if isinstance(data, list) else []
-                print(f"✅ {len(rules)} règles chargées depuis {self.yaml_path}")
-                return rules
+            with open(self.yaml_path, "rb") as f:
+                raw = f.read()
         except FileNotFoundError:
             print(f"❌ Fichier YAML non trouvé: {self.yaml_path}")
-            return []
-        except yaml.YAMLError as e:
-            print(f"❌ Erreur parsing YAML: {e}")
-            return []
+            return RuleStore(())
         except Exception as e:
             print(f"❌ Erreur chargement YAML: {e}")
-            return []
+            return RuleStore(())
+        
+        self.version = hashlib.sha256(raw).hexdigest()
+        
+        compiled = self._read_artifact()
+        if compiled is None:
+            try:
+                compiled = self._compile(raw)
+            except yaml.YAMLError as e:
+                print(f"❌ Erreur parsing YAML: {e}")
+                return RuleStore(())
+            except Exception as e:
+                print(f"❌ Erreur chargement YAML: {e}")
+                return RuleStore(())
+            self._write_artifact(compiled)
+        
+        self.validation_report = compiled["validation"]
+        
+        rules = [
+            Rule.from_dict(raw_rule, keywords, fact_line)
+            for raw_rule, keywords, fact_line in zip(
+                compiled["rules"], compiled["keywords"], compiled["fact_lines"]
+            )
+        ]
+        print(f"✅ {len(rules)} règles chargées depuis {self.yaml_path}")
+        return RuleStore(rules, self.VITAL_RULE_IDS)
     
-    def _build_keyword_index(self) -> None:
-        """Construit un index inversé des keywords pour recherche rapide."""
-        self._keyword_to_rules: Dict[str, List[Dict]] = {}
-        
-        for rule in self.rules:
-            keywords = rule.get("keywords", [])
-            for kw in keywords:
-                if isinstance(kw, str):
-                    normalized_kw = self._normalize_text(kw)
-                    if normalized_kw not in self._keyword_to_rules:
-                        self._keyword_to_rules[normalized_kw] = []
-                    self._keyword_to_rules[normalized_kw].append(rule)
-    
-    def _normalize_text(self, text: str) -> str:
+    def _compile(self, raw: bytes) -> Dict:
         """
-        Normalise le texte pour le matching robuste.
-        - Mise en minuscules
-        - Suppression des accents
-        - Remplacement des tirets et apostrophes par des espaces
-        - Suppression des caractères spéciaux
+        Compile le YAML brut : parsing (loader C), validation, normalisation
+        des keywords et lignes de faits prérendues.
+        Les règles invalides sont écartées et n'atteignent jamais le moteur.
         
         Args:
-            text: Texte à normaliser
+            raw: Contenu binaire du fichier YAML
             
         Returns:
-            Texte normalisé
+            Snapshot compilé (types JSON uniquement)
         """
-        if not text:
-            return ""
-        
-        # Minuscules
-        text = text.lower()
-        
-        # Suppression des accents (é -> e, ç -> c, etc.)
-        text = unicodedata.normalize('NFKD', text)
-        text = text.encode('ASCII', 'ignore').decode('ASCII')
-        
-        # Remplacement des séparateurs par des espaces
-        text = text.replace("-", " ")
-        text = text.replace("'", " ")
-        text = text.replace("'", " ")  # Apostrophe typographique
-        text = text.replace("_", " ")
-        
-        # Suppression des caractères spéciaux (garde lettres, chiffres, espaces)
-        text = re.sub(r"[^a-z0-9\s]", " ", text)
+        data = yaml.load(raw, Loader=_YAML_LOADER)
+        parsed = data if isinstance(data, list) else []
+        
+        report, rules = self._check_rules(parsed)
+        if report["issues"]:
+            print(f"⚠️ {report['issues_count']} anomalie(s) YAML, règles écartées: {report['issues'][:5]}")
+        
+        keywords = [
+            tuple(self._normalize_text(kw) for kw in (rule.get("keywords") or []) if isinstance(kw, str))
+            for rule in rules
+        ]
+        fact_lines = [self._render_fact_line(rule) for rule in rules]
+        
+        compiled = {
+            "format": self.ARTIFACT_FORMAT,
+            "version": self.version,
+            "rules": rules,
+            "keywords": keywords,
+            "fact_lines": fact_lines,
+            "validation": report
+        }
+        # Mêmes valeurs qu'après relecture du snapshot (dates YAML en texte ISO)
+        return json.loads(json.dumps(compiled, ensure_ascii=False, default=str))
+    
+    def _artifact_path(self) -> str:
+        """Chemin du snapshot compilé, indexé par l'empreinte du YAML."""
+        yaml_dir = os.path.dirname(self.yaml_path) or "."
+        stem = os.path.splitext(os.path.basename(self.yaml_path))[0]
+        return os.path.join(yaml_dir, COMPILED_DIR_NAME, f"{stem}.{self.version[:16]}.json")
+    
+    def _read_artifact(self) -> Optional[Dict]:
+        """
+        Charge le snapshot compilé s'il existe et correspond au YAML.
+        Format JSON (données uniquement) : un fichier déposé dans le dossier
+        des snapshots ne peut pas exécuter de code au démarrage.
+        """
+        path = self._artifact_path()
+        if not os.path.exists(path):
+            return None
         
-        # Normalisation des espaces multiples
-        text = re.sub(r"\s+", " ", text).strip()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                compiled = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Snapshot compilé illisible ({path}): {e}")
+            return None
+        
+        if (not isinstance(compiled, dict)
+                or compiled.get("format") != self.ARTIFACT_FORMAT
+                or compiled.get("version") != self.version):
+            return None
+        return compiled
+    
+    def _write_artifact(self, compiled: Dict) -> None:
+        """Écrit le snapshot compilé (atomique) et purge les versions périmées."""
+        path = self._artifact_path()
+        compiled_dir = os.path.dirname(path)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
         
-        return text
+        try:
+            os.makedirs(compiled_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(compiled, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Système de fichiers en lecture seule : on garde la version en mémoire
+            print(f"⚠️ Snapshot compilé non écrit: {e}")
+            return
+        
+        # Versions périmées, et snapshots pickle des anciens formats
+        prefix = os.path.splitext(os.path.basename(self.yaml_path))[0] + "."
+        for name in os.listdir(compiled_dir):
+            stale = os.path.join(compiled_dir, name)
+            if name.startswith(prefix) and name.endswith((".json", ".pickle")) and stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+    
+    def _build_keyword_index(self) -> None:
+        """
+        Construit un index inversé des keywords pour recherche rapide,
+        ainsi que le matcher compilé et l'index BM25 utilisés par match_rules().
+        """
+        self._keyword_to_rules: Dict[str, List[Rule]] = {}
+        vital_ids = set(self.VITAL_RULE_IDS)
+        rule_keywords = []
+        bm25_documents = []
+        
+        for idx, rule in enumerate(self.rules):
+            for normalized_kw in rule.normalized_keywords:
+                if normalized_kw not in self._keyword_to_rules:
+                    self._keyword_to_rules[normalized_kw] = []
+                self._keyword_to_rules[normalized_kw].append(rule)
+            
+            # Seules les règles non vitales avec keywords sont scorées
+            if rule.keywords and rule.id not in vital_ids:
+                rule_keywords.append((idx, frozenset(rule.normalized_keywords)))
+                kw_tokens = [t for kw in rule.normalized_keywords for t in kw.split() if len(t) >= 2]
+                bm25_documents.append((idx, kw_tokens, self._tokenize(rule.text or "")))
+        
+        self._matcher = KeywordMatcher(rule_keywords)
+        self._bm25 = BM25Index(bm25_documents)
+        self._build_instant_index()
+    
+    def _normalize_text(self, text: str) -> str:
+        """Normalise le texte pour le matching robuste (voir normalize_text)."""
+        return normalize_text(text)
     
     def _tokenize(self, text: str) -> List[str]:
         """
@@ -146,7 +339,8 @@ class SocialRuleEngine:
         
         return tokens
     
-    def match_rules(self, query: str, top_k: int = 7, min_score: int = 1) -> List[Dict]:
+    def match_rules(self, query: str, top_k: int = 7, min_score: int = 1,
+                    scoring: str = SCORING_ADDITIVE) -> List[Rule]:
         """
         Match les règles YAML avec la requête utilisateur.
         
@@ -154,94 +348,143 @@ class SocialRuleEngine:
             query: Question de l'utilisateur
             top_k: Nombre maximum de règles spécifiques à retourner
             min_score: Score minimum pour qu'une règle soit retenue
+                (mode additif ; en mode BM25 tout score positif est retenu)
+            scoring: "additive" (+2 token exact, +1 inclusion, +1 requête
+                courte) ou "bm25" (pondération par rareté des termes)
             
         Returns:
             Liste des règles matchées (vitales + spécifiques)
         """
+        if scoring not in (self.SCORING_ADDITIVE, self.SCORING_BM25):
+            raise ValueError(f"Mode de scoring inconnu: {scoring}")
+        
         if not query:
             return self._get_vital_rules()
         
         query_normalized = self._normalize_text(query)
-        query_tokens = self._tokenize(query)
+        query_tokens = [w for w in query_normalized.split() if len(w) >= 2]
         
         # 1. Récupération des règles vitales (toujours présentes)
         vital_rules = self._get_vital_rules()
-        vital_ids = set(self.VITAL_RULE_IDS)
-        
-        # 2. Scoring des règles par mots-clés
-        results: List[tuple] = []
         
-        for rule in self.rules:
-            rule_id = rule.get("id", "")
-            
-            # Skip les règles vitales (déjà incluses)
-            if rule_id in vital_ids:
-                continue
-            
-            rule_keywords = rule.get("keywords", [])
-            if not rule_keywords:
-                continue
-            
-            score = 0
-            
-            # Normalisation des keywords de la règle
-            rule_kw_normalized: Set[str] = set()
-            for kw in rule_keywords:
-                if isinstance(kw, str):
-                    rule_kw_normalized.add(self._normalize_text(kw))
-            
-            # Score par token exact
-            for token in query_tokens:
-                if token in rule_kw_normalized:
-                    score += 2  # Bonus pour match exact
-            
-            # Score par inclusion partielle (keyword dans query)
-            for kw_norm in rule_kw_normalized:
-                if kw_norm in query_normalized:
-                    score += 1
-            
-            # Bonus pour les requêtes courtes (intention forte)
-            if len(query_tokens) <= 5 and score > 0:
-                score += 1
-            
-            if score >= min_score:
-                results.append((score, rule))
+        # 2. Scoring des règles par mots-clés (index compilés au chargement)
+        if scoring == self.SCORING_BM25:
+            ranked = self._bm25.rank(query_tokens)
+        else:
+            ranked = self._matcher.rank(query_normalized, query_tokens, min_score)
         
-        # 3. Tri par score décroissant et sélection top_k
-        results.sort(key=lambda x: x[0], reverse=True)
-        matched_rules = [r for _, r in results[:top_k]]
+        # 3. Sélection top_k (tri par score décroissant, ordre YAML si égalité)
+        matched_rules = [self.rules[idx] for idx, _ in ranked[:top_k]]
         
         # 4. Log pour debug
         if matched_rules:
-            matched_ids = [r.get("id", "?") for r in matched_rules[:3]]
+            matched_ids = [r.id for r in matched_rules[:3]]
             print(f"🔍 Règles matchées: {matched_ids}...")
         
         # Retourne vitales + spécifiques
         return vital_rules + matched_rules
     
-    def _get_vital_rules(self) -> List[Dict]:
-        """Retourne les règles vitales (SMIC, PASS, etc.)."""
-        return [r for r in self.rules if r.get("id") in self.VITAL_RULE_IDS]
+    def match_rules_batch(self, queries: List[str], top_k: int = 7, min_score: int = 1,
+                          scoring: str = SCORING_ADDITIVE,
+                          chunk_size: int = 1024) -> List[List[str]]:
+        """
+        Match un lot de requêtes en une passe (évaluation hors ligne, rejeu
+        de questions). Même classement que match_rules(), sans log par appel.
+        
+        Args:
+            queries: Questions à matcher
+            top_k: Nombre maximum de règles spécifiques par requête
+            min_score: Score minimum (mode additif)
+            scoring: "additive" ou "bm25"
+            chunk_size: Nombre de requêtes scorées par opération matricielle
+            
+        Returns:
+            Pour chaque requête, les IDs des règles spécifiques classées
+            (les règles vitales, toujours injectées, ne sont pas répétées)
+        """
+        if scoring not in (self.SCORING_ADDITIVE, self.SCORING_BM25):
+            raise ValueError(f"Mode de scoring inconnu: {scoring}")
+        
+        # 1. Normalisation et tokenisation de tout le lot
+        normalized = [self._normalize_text(q) if q else "" for q in queries]
+        tokens = [[w for w in n.split() if len(w) >= 2] for n in normalized]
+        
+        results: List[List[str]] = []
+        rules = self.rules
+        
+        # 2. Scoring matriciel par blocs (mémoire bornée)
+        for start in range(0, len(queries), chunk_size):
+            end = start + chunk_size
+            if scoring == self.SCORING_BM25:
+                scores = self._bm25.scores_batch(tokens[start:end])
+                ranked = top_k_rows(scores, scores > 0, top_k)
+                doc_ids = self._bm25.doc_ids
+                ranked = [doc_ids[row] for row in ranked]
+            else:
+                ranked = self._matcher.rank_batch(
+                    normalized[start:end], tokens[start:end], len(rules), top_k, min_score
+                )
+            
+            for query, row in zip(queries[start:end], ranked):
+                results.append([rules[idx].id for idx in row] if query else [])
+        
+        return results
+    
+    def _get_vital_rules(self) -> List[Rule]:
+        """Retourne les règles vitales (SMIC, PASS, etc.), précalculées par le store."""
+        return list(self.store.vital_rules)
     
-    def get_base_rules(self) -> List[Dict]:
+    def get_base_rules(self) -> List[Rule]:
         """
         Retourne les règles de base pour fallback.
         Alias de _get_vital_rules() pour compatibilité.
         """
         return self._get_vital_rules()
     
-    def format_certified_facts(self, matched_rules: List[Dict]) -> str:
+    def format_certified_facts(self, matched_rules: List[Rule], query: Optional[str] = None,
+                               include_vital: bool = True) -> str:
         """
         Formate les règles matchées en texte pour le prompt.
         
         Args:
             matched_rules: Liste des règles matchées
+            query: Question de l'utilisateur ; si elle contient les paramètres
+                d'un calcul couvert (salaire, ancienneté, jours de télétravail...),
+                le résultat exact des calculateurs est ajouté aux faits
+            include_vital: False si les règles vitales sont déjà dans le
+                préfixe statique du prompt (voir format_vital_facts)
             
         Returns:
             Texte formaté des faits certifiés
         """
-        if not matched_rules:
-            return "(Aucune règle spécifique trouvée)"
+        facts_rules = matched_rules
+        if not include_vital:
+            vital_ids = set(self.VITAL_RULE_IDS)
+            facts_rules = [rule for rule in matched_rules if rule.get("id", "") not in vital_ids]
+        
+        if not facts_rules:
+            facts = "(Aucune règle spécifique trouvée)"
+        else:
+            facts = self._format_rule_facts(facts_rules)
+        
+        if query:
+            calculations = certified_calculations(
+                self.store, [rule.get("id", "") for rule in matched_rules], query
+            )
+            if calculations:
+                facts = facts + "\n" + "\n".join(calculations)
+        
+        return facts
+    
+    def format_vital_facts(self) -> str:
+        """Faits des règles vitales, identiques pour toutes les questions du snapshot."""
+        return self._vital_prefix or "(Aucune règle applicable)"
+    
+    def _format_rule_facts(self, matched_rules: List[Rule]) -> str:
+        """Rend les lignes de faits des règles (mémorisé pour les règles du store)."""
+        store_get = self.store.get
+        if all(isinstance(rule, Rule) and store_get(rule.id) is rule for rule in matched_rules):
+            return self._facts_cache(tuple(rule.id for rule in matched_rules))
         
         lines = []
         seen_ids: Set[str] = set()
@@ -254,15 +497,181 @@ class SocialRuleEngine:
                 continue
             seen_ids.add(rule_id)
             
-            text = (rule.get("text") or "").strip()
-            source = (rule.get("source") or "Règle Officielle").strip()
-            
-            if text:
-                lines.append(f"- {text} (Source : {source})")
+            line = rule.fact_line if isinstance(rule, Rule) else self._render_fact_line(rule)
+            if line:
+                lines.append(line)
+        
+        return "\n".join(lines).strip() if lines else "(Aucune règle applicable)"
+    
+    def _build_facts_cache(self) -> None:
+        """
+        Prépare le rendu des faits certifiés : préfixe des règles vitales
+        (identique pour toutes les questions) et cache LRU par combinaison
+        d'IDs, propre à ce snapshot et partagé par toutes les sessions.
+        """
+        vital_rules = self.store.vital_rules
+        self._vital_ids: Tuple[str, ...] = tuple(rule.id for rule in vital_rules)
+        self._vital_prefix: str = "\n".join(rule.fact_line for rule in vital_rules if rule.fact_line)
+        self._facts_cache = functools.lru_cache(maxsize=self.FACTS_CACHE_SIZE)(self._render_facts)
+    
+    def _render_facts(self, rule_ids: Tuple[str, ...]) -> str:
+        """Rend les faits certifiés d'une combinaison d'IDs du store."""
+        n_vital = len(self._vital_ids)
+        if n_vital and rule_ids[:n_vital] == self._vital_ids:
+            # Cas nominal de match_rules() : vitales en tête, préfixe prérendu
+            lines = [self._vital_prefix] if self._vital_prefix else []
+            seen_ids: Set[str] = set(self._vital_ids)
+            remaining = rule_ids[n_vital:]
+        else:
+            lines = []
+            seen_ids = set()
+            remaining = rule_ids
+        
+        for rule_id in remaining:
+            if rule_id in seen_ids:
+                continue
+            seen_ids.add(rule_id)
+            line = self.store.get(rule_id).fact_line
+            if line:
+                lines.append(line)
         
         return "\n".join(lines).strip() if lines else "(Aucune règle applicable)"
     
-    def get_rule_by_id(self, rule_id: str) -> Optional[Dict]:
+    def clear_caches(self) -> None:
+        """Vide les fragments de prompt mémorisés pour ce snapshot."""
+        self._facts_cache.cache_clear()
+    
+    @staticmethod
+    def _render_fact_line(rule: Dict) -> str:
+        """Rend la ligne de fait certifié d'une règle (vide si pas de texte)."""
+        text = (rule.get("text") or "").strip()
+        source = (rule.get("source") or "Règle Officielle").strip()
+        return f"- {text} (Source : {source})" if text else ""
+    
+    def _build_instant_index(self) -> None:
+        """
+        Index de recherche de valeur : toutes les règles avec keywords
+        (vitales comprises) et tokens de leur ID ("SMIC_2026" -> "smic").
+        """
+        self._instant_matcher = KeywordMatcher([
+            (idx, frozenset(rule.normalized_keywords))
+            for idx, rule in enumerate(self.rules) if rule.keywords
+        ])
+        
+        id_postings: Dict[str, List[int]] = {}
+        for idx, rule in enumerate(self.rules):
+            for token in self._tokenize(rule.id):
+                if not token.isdigit():
+                    id_postings.setdefault(token, []).append(idx)
+        self._id_token_postings: Dict[str, Tuple[int, ...]] = {
+            token: tuple(idxs) for token, idxs in id_postings.items()
+        }
+    
+    def find_instant_rule(self, query: str) -> Optional[Rule]:
+        """
+        Détecte une question de pure lecture de barème ("SMIC 2026",
+        "PASS mensuel") à laquelle une seule règle répond sans ambiguïté.
+        
+        Args:
+            query: Question de l'utilisateur
+            
+        Returns:
+            La règle si le match est décisif et porte des valeurs chiffrées,
+            None sinon (le parcours complet RAG + LLM s'applique)
+        """
+        if not query:
+            return None
+        
+        query_normalized = self._normalize_text(query)
+        query_tokens = [w for w in query_normalized.split() if len(w) >= 2]
+        if not query_tokens or len(query_tokens) > self.INSTANT_MAX_TOKENS:
+            return None
+        
+        for token in query_normalized.split():
+            # Un nombre (hors année) ou une intention de calcul/rédaction => LLM
+            if any(c.isdigit() for c in token) and not (token.isdigit() and len(token) == 4):
+                return None
+            if token.startswith(self.INSTANT_BLOCKING_PREFIXES):
+                return None
+        
+        scores = self._instant_matcher.score(query_normalized, query_tokens)
+        for token in query_tokens:
+            for idx in self._id_token_postings.get(token, ()):
+                scores[idx] = scores.get(idx, 0) + self.INSTANT_ID_TOKEN_WEIGHT
+        if not scores:
+            return None
+        
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        best_idx, best = ranked[0]
+        second = ranked[1][1] if len(ranked) > 1 else 0
+        
+        if (best < self.INSTANT_MIN_SCORE
+                or best - second < self.INSTANT_MIN_MARGIN
+                or best < self.INSTANT_MIN_RATIO * second):
+            return None
+        
+        rule = self.rules[best_idx]
+        
+        # Chaque mot de la question doit être couvert par la règle : "smic net",
+        # "smic mayotte", "smic 2025" ou "le smic a-t-il augmenté" vont au LLM
+        rule_tokens = set(self._tokenize(rule.id))
+        for kw in rule.normalized_keywords:
+            rule_tokens.update(kw.split())
+        for token in query_tokens:
+            if token in self.INSTANT_STOPWORDS:
+                continue
+            if token not in rule_tokens:
+                return None
+        
+        has_numbers = any(
+            isinstance(v, (int, float)) and not isinstance(v, bool) for v in rule.valeurs.values()
+        )
+        if not rule.text or not has_numbers:
+            return None
+        
+        print(f"⚡ Réponse instantanée YAML: {rule.id}")
+        return rule
+    
+    def format_instant_answer(self, rule: Rule) -> str:
+        """
+        Rédige la réponse directe d'une règle, au format du plan de réponse
+        de l'assistant (compatible historique et export PDF).
+        
+        Args:
+            rule: Règle retenue par find_instant_rule()
+            
+        Returns:
+            Réponse Markdown
+        """
+        source = (rule.source or "Règle Officielle").strip()
+        details = "\n".join(
+            f"- **{key.replace('_', ' ').capitalize()}** : {self._format_value(val)}"
+            for key, val in rule.valeurs.items()
+        )
+        
+        return (
+            "### ANALYSE & RÈGLES\n"
+            f"Valeur officielle issue du référentiel certifié ({source}).\n\n"
+            "### DÉTAIL & CHIFFRES\n"
+            f"{details}\n\n"
+            "### RÉSULTAT\n"
+            f"{(rule.text or '').strip()}\n\n"
+            f"Sources utilisées : ({source})"
+        )
+    
+    @staticmethod
+    def _format_value(val) -> str:
+        """Formate une valeur YAML à la française (4 005,00 ; 0,0825 ; Oui)."""
+        if isinstance(val, bool):
+            return "Oui" if val else "Non"
+        if isinstance(val, (int, float)):
+            text = f"{val:,.4f}".rstrip("0")
+            integer, _, decimals = text.partition(".")
+            decimals = decimals.ljust(2, "0")
+            return f"{integer.replace(',', ' ')},{decimals}"
+        return str(val)
+    
+    def get_rule_by_id(self, rule_id: str) -> Optional[Rule]:
         """
         Récupère une règle par son ID.
         
@@ -272,10 +681,20 @@ class SocialRuleEngine:
         Returns:
             Règle ou None si non trouvée
         """
-        for rule in self.rules:
-            if rule.get("id") == rule_id:
-                return rule
-        return None
+        return self.store.get(rule_id)
+    
+    def get_value(self, path: str, default=None):
+        """
+        Récupère une valeur YAML par chemin pointé.
+        
+        Args:
+            path: Chemin "<ID_REGLE>.<clé>", ex: "PASS_2026.mensuel"
+            default: Valeur retournée si le chemin est absent
+            
+        Returns:
+            Valeur typée (float, int, str, bool) ou default
+        """
+        return self.store.value(path, default)
     
     def get_yaml_update_date(self) -> str:
         """Récupère la date de dernière mise à jour du YAML."""
@@ -283,8 +702,8 @@ class SocialRuleEngine:
             return "Janvier 2026"
         
         for rule in self.rules:
-            if rule.get("derniere_maj"):
-                return rule.get("derniere_maj")
+            if rule.derniere_maj:
+                return rule.derniere_maj
         
         return "Janvier 2026"
     
@@ -292,13 +711,12 @@ class SocialRuleEngine:
         """Retourne la liste de tous les keywords disponibles."""
         all_kw = set()
         for rule in self.rules:
-            keywords = rule.get("keywords", [])
-            for kw in keywords:
+            for kw in rule.keywords:
                 if isinstance(kw, str):
                     all_kw.add(kw.lower())
         return sorted(list(all_kw))
     
-    def search_rules_by_keyword(self, keyword: str) -> List[Dict]:
+    def search_rules_by_keyword(self, keyword: str) -> List[Rule]:
         """
         Recherche toutes les règles contenant un keyword spécifique.
         
@@ -314,8 +732,8 @@ class SocialRuleEngine:
     def get_stats(self) -> Dict:
         """Retourne des statistiques sur les règles chargées."""
         total_rules = len(self.rules)
-        rules_with_keywords = sum(1 for r in self.rules if r.get("keywords"))
-        total_keywords = sum(len(r.get("keywords", [])) for r in self.rules)
+        rules_with_keywords = sum(1 for r in self.rules if r.keywords)
+        total_keywords = sum(len(r.keywords) for r in self.rules)
         
         return {
             "total_rules": total_rules,
@@ -324,31 +742,69 @@ class SocialRuleEngine:
             "total_keywords": total_keywords,
             "avg_keywords_per_rule": round(total_keywords / max(total_rules, 1), 1),
             "yaml_path": self.yaml_path,
+            "version": self.version[:12],
+            "facts_cache_hits": self._facts_cache.cache_info().hits,
             "last_update": self.get_yaml_update_date()
         }
     
     def validate_yaml(self) -> Dict:
         """
         Valide le fichier YAML et retourne un rapport.
+        Le rapport est établi à la compilation, sur le YAML brut.
         
         Returns:
             Dictionnaire avec le rapport de validation
         """
+        if self.validation_report is not None:
+            return self.validation_report
+        # YAML non chargé : rapport vide
+        return self._check_rules([])[0]
+    
+    @staticmethod
+    def _check_rules(rules: List) -> Tuple[Dict, List[Dict]]:
+        """
+        Contrôle les règles parsées.
+        
+        Args:
+            rules: Entrées brutes issues du YAML
+            
+        Returns:
+            Tuple (rapport de validation, règles valides)
+        """
         issues = []
         warnings = []
+        valid_rules = []
         
         seen_ids = set()
         
-        for i, rule in enumerate(self.rules):
+        for i, rule in enumerate(rules):
+            # Vérification structure
+            if not isinstance(rule, dict):
+                issues.append(f"Entrée invalide (pas une règle) en position {i}")
+                continue
+            
             rule_id = rule.get("id", f"RULE_{i}")
             
             # Vérification ID unique
             if rule_id in seen_ids:
                 issues.append(f"ID dupliqué: {rule_id}")
+                continue
             seen_ids.add(rule_id)
             
+            keywords = rule.get("keywords")
+            if keywords is not None and not isinstance(keywords, list):
+                issues.append(f"Keywords invalides (liste attendue): {rule_id}")
+                continue
+            
+            valeurs = rule.get("valeurs")
+            if valeurs is not None and not isinstance(valeurs, dict):
+                issues.append(f"Valeurs invalides (dictionnaire attendu): {rule_id}")
+                continue
+            
+            valid_rules.append(rule)
+            
             # Vérification keywords présents
-            if not rule.get("keywords"):
+            if not keywords:
                 warnings.append(f"Pas de keywords: {rule_id}")
             
             # Vérification texte présent
@@ -360,26 +816,28 @@ class SocialRuleEngine:
                 warnings.append(f"Pas de source: {rule_id}")
             
             # Vérification valeurs numériques
-            valeurs = rule.get("valeurs", {})
             if valeurs:
                 for key, val in valeurs.items():
                     if isinstance(val, (int, float)) and val < 0:
                         warnings.append(f"Valeur négative {key} dans {rule_id}")
         
-        return {
+        report = {
             "valid": len(issues) == 0,
-            "total_rules": len(self.rules),
+            "total_rules": len(rules),
             "issues": issues,
             "warnings": warnings,
             "issues_count": len(issues),
             "warnings_count": len(warnings)
         }
+        return report, valid_rules
 
 
 # ==============================================================================
 # TESTS UNITAIRES (exécutés si lancé directement)
 # ==============================================================================
 if __name__ == "__main__":
+    import time
+    
     print("=" * 60)
     print("TEST DU MOTEUR DE RÈGLES SOCIAL V4.0")
     print("=" * 60)
@@ -418,9 +876,23 @@ if __name__ == "__main__":
     print(f"\n🔍 TESTS DE MATCHING:")
     for query in test_queries:
         matched = engine.match_rules(query, top_k=3)
-        specific = [r.get("id") for r in matched if r.get("id") not in engine.VITAL_RULE_IDS]
+        specific = [r.id for r in matched if r.id not in engine.VITAL_RULE_IDS]
         print(f"   '{query[:40]}...' -> {specific[:3]}")
     
+    # Comparaison scoring additif vs BM25
+    print(f"\n⚖️  COMPARAISON ADDITIF / BM25:")
+    for query in test_queries:
+        comparison = {}
+        for mode in (engine.SCORING_ADDITIVE, engine.SCORING_BM25):
+            start = time.perf_counter()
+            matched = engine.match_rules(query, top_k=3, scoring=mode)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            specific = [r.id for r in matched if r.id not in engine.VITAL_RULE_IDS]
+            comparison[mode] = (specific[:3], elapsed_ms)
+        print(f"   '{query[:40]}'")
+        for mode, (ids, elapsed_ms) in comparison.items():
+            print(f"      {mode:<8} ({elapsed_ms:.3f} ms) -> {ids}")
+    
     # Test normalisation
     print(f"\n🔤 TESTS NORMALISATION:")
     test_texts = [
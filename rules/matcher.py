@@ -0,0 +1,259 @@
+"""
+==============================================================================
+KEYWORD MATCHER - INDEX COMPILÉ DES MOTS-CLÉS YAML
+VERSION : 4.1 (POSTINGS PAR TOKEN + AUTOMATE AHO-CORASICK)
+DATE : 18/10/2026
+==============================================================================
+"""
+
+from typing import Dict, FrozenSet, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from rules.sparse import accumulate, build_csr, gather_rows, top_k_rows
+
+
+class _AhoCorasick:
+    """
+    Automate multi-motifs (Aho-Corasick) sur des chaînes normalisées.
+    Un seul passage sur le texte suffit pour trouver tous les motifs inclus,
+    quel que soit leur nombre.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        """
+        Construit l'automate.
+
+        Args:
+            patterns: Motifs non vides, indexés par leur position
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        # 1. Trie des motifs
+        for pattern_id, pattern in enumerate(patterns):
+            node = 0
+            for char in pattern:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] = self._out[node] + (pattern_id,)
+
+        # 2. Liens d'échec (parcours en largeur) et fusion des sorties
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> Set[int]:
+        """
+        Retourne les identifiants des motifs présents dans le texte.
+
+        Args:
+            text: Texte normalisé
+
+        Returns:
+            Ensemble des identifiants de motifs trouvés
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        found: Set[int] = set()
+        node = 0
+
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+
+        return found
+
+
+class KeywordMatcher:
+    """
+    Index compilé une seule fois au chargement des règles.
+    - Postings token -> règles pour le score de match exact (+2 par token)
+    - Automate Aho-Corasick pour le score d'inclusion (+1 par keyword contenu)
+    Le coût du matching dépend de la longueur de la requête, plus du
+    produit règles × keywords.
+    """
+
+    def __init__(self, rule_keywords: Sequence[Tuple[int, FrozenSet[str]]]):
+        """
+        Compile l'index.
+
+        Args:
+            rule_keywords: Couples (position de la règle, keywords normalisés)
+                pour chaque règle éligible au scoring, dans l'ordre du YAML
+        """
+        self.rule_keywords: Dict[int, FrozenSet[str]] = {}
+        self._eligible: Tuple[int, ...] = tuple(idx for idx, _ in rule_keywords)
+        self._token_postings: Dict[str, Tuple[int, ...]] = {}
+        self._always_contained: Tuple[int, ...] = ()
+
+        token_postings: Dict[str, List[int]] = {}
+        keyword_rules: Dict[str, List[int]] = {}
+        always_contained: List[int] = []
+
+        for rule_idx, keywords in rule_keywords:
+            self.rule_keywords[rule_idx] = keywords
+            for kw in keywords:
+                if not kw:
+                    # Un keyword vide est "contenu" dans toute requête
+                    always_contained.append(rule_idx)
+                    continue
+                keyword_rules.setdefault(kw, []).append(rule_idx)
+                if " " not in kw:
+                    token_postings.setdefault(kw, []).append(rule_idx)
+
+        self._token_postings = {kw: tuple(idxs) for kw, idxs in token_postings.items()}
+        self._always_contained = tuple(always_contained)
+
+        patterns = list(keyword_rules)
+        self._pattern_rules: List[Tuple[int, ...]] = [tuple(keyword_rules[p]) for p in patterns]
+        self._automaton = _AhoCorasick(patterns)
+
+        # Mêmes postings en CSR pour le scoring par lots
+        self._token_ids: Dict[str, int] = {kw: i for i, kw in enumerate(self._token_postings)}
+        self._token_csr = build_csr(list(self._token_postings.values()))
+        self._pattern_csr = build_csr(self._pattern_rules)
+
+    def score(self, query_normalized: str, query_tokens: Sequence[str]) -> Dict[int, int]:
+        """
+        Calcule les scores bruts (hors bonus requête courte) des règles touchées.
+
+        Args:
+            query_normalized: Requête normalisée
+            query_tokens: Tokens de la requête (doublons conservés)
+
+        Returns:
+            Dictionnaire position de règle -> score (règles à score nul absentes)
+        """
+        scores: Dict[int, int] = {}
+        postings = self._token_postings
+
+        # Score par token exact
+        for token in query_tokens:
+            for rule_idx in postings.get(token, ()):
+                scores[rule_idx] = scores.get(rule_idx, 0) + 2
+
+        # Score par inclusion partielle (keyword dans query)
+        pattern_rules = self._pattern_rules
+        for pattern_id in self._automaton.find(query_normalized):
+            for rule_idx in pattern_rules[pattern_id]:
+                scores[rule_idx] = scores.get(rule_idx, 0) + 1
+
+        for rule_idx in self._always_contained:
+            scores[rule_idx] = scores.get(rule_idx, 0) + 1
+
+        return scores
+
+    def rank(self, query_normalized: str, query_tokens: Sequence[str],
+             min_score: int = 1) -> List[Tuple[int, int]]:
+        """
+        Classe les règles comme le scoring additif historique.
+
+        Args:
+            query_normalized: Requête normalisée
+            query_tokens: Tokens de la requête
+            min_score: Score minimum pour qu'une règle soit retenue
+
+        Returns:
+            Couples (position de règle, score) triés par score décroissant,
+            ordre du YAML en cas d'égalité
+        """
+        scores = self.score(query_normalized, query_tokens)
+
+        # Bonus pour les requêtes courtes (intention forte)
+        if len(query_tokens) <= 5:
+            for rule_idx in scores:
+                scores[rule_idx] += 1
+
+        if min_score <= 0:
+            candidates = [(idx, scores.get(idx, 0)) for idx in self._eligible]
+        else:
+            candidates = [(idx, s) for idx, s in scores.items() if s >= min_score]
+
+        candidates.sort(key=lambda item: (-item[1], item[0]))
+        return candidates
+
+    def rank_batch(self, queries_normalized: Sequence[str],
+                   queries_tokens: Sequence[Sequence[str]], n_rules: int,
+                   top_k: int, min_score: int = 1) -> List[np.ndarray]:
+        """
+        Équivalent de rank() pour un lot de requêtes, scoré en une seule
+        opération matricielle (requêtes × règles).
+
+        Args:
+            queries_normalized: Requêtes normalisées
+            queries_tokens: Tokens de chaque requête
+            n_rules: Nombre total de règles (colonnes de la matrice)
+            top_k: Nombre maximum de règles par requête
+            min_score: Score minimum pour qu'une règle soit retenue
+
+        Returns:
+            Pour chaque requête, les positions des règles retenues, classées
+        """
+        n_queries = len(queries_normalized)
+        token_ids = self._token_ids
+
+        # 1. Coordonnées (requête, ligne CSR) des deux composantes du score
+        token_rows: List[int] = []
+        token_owners: List[int] = []
+        pattern_rows: List[int] = []
+        pattern_owners: List[int] = []
+        for q, (normalized, tokens) in enumerate(zip(queries_normalized, queries_tokens)):
+            for token in tokens:
+                term_id = token_ids.get(token)
+                if term_id is not None:
+                    token_rows.append(term_id)
+                    token_owners.append(q)
+            found = self._automaton.find(normalized)
+            pattern_rows.extend(found)
+            pattern_owners.extend([q] * len(found))
+
+        # 2. Score exact (+2 par token) et inclusion (+1 par keyword)
+        rows_e, cols_e, vals_e = gather_rows(
+            *self._token_csr,
+            np.array(token_rows, dtype=np.int64), np.array(token_owners, dtype=np.int64),
+            np.full(len(token_rows), 2.0, dtype=np.float32)
+        )
+        rows_c, cols_c, vals_c = gather_rows(
+            *self._pattern_csr,
+            np.array(pattern_rows, dtype=np.int64), np.array(pattern_owners, dtype=np.int64),
+            np.ones(len(pattern_rows), dtype=np.float32)
+        )
+        scores = accumulate(
+            np.concatenate([rows_e, rows_c]), np.concatenate([cols_e, cols_c]),
+            np.concatenate([vals_e, vals_c]), n_queries, n_rules
+        )
+        for rule_idx in self._always_contained:
+            scores[:, rule_idx] += 1
+
+        # 3. Bonus pour les requêtes courtes (intention forte)
+        short = np.array([len(tokens) <= 5 for tokens in queries_tokens], dtype=bool)
+        scores += (short[:, None] & (scores > 0)).astype(np.float32)
+
+        # 4. Sélection (règles éligibles, score minimum)
+        eligible = np.zeros(n_rules, dtype=bool)
+        eligible[list(self._eligible)] = True
+        candidates = eligible[None, :] & (scores >= min_score) if min_score > 0 \
+            else np.broadcast_to(eligible, scores.shape)
+        return top_k_rows(scores, candidates, top_k)
@@ -0,0 +1,135 @@
+"""
+==============================================================================
+RULE ENGINE REGISTRY - MOTEUR PARTAGÉ & RECHARGEMENT À CHAUD
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import hashlib
+import os
+import threading
+from typing import Optional, Tuple
+
+from rules.engine import SocialRuleEngine
+from utils.helpers import shared_instance
+
+
+class RuleEngineRegistry:
+    """
+    Détient l'unique instance de SocialRuleEngine du processus.
+    Un thread de surveillance reconstruit un nouveau moteur lorsque le YAML
+    change, puis le substitue atomiquement. Les requêtes en cours conservent
+    l'instance (snapshot) obtenue via get().
+    """
+
+    def __init__(self, yaml_path: str = "rules/social_rules.yaml", poll_interval: float = 5.0):
+        """
+        Charge le moteur initial.
+
+        Args:
+            yaml_path: Chemin vers le fichier YAML des règles
+            poll_interval: Intervalle de surveillance du YAML (secondes)
+        """
+        self.poll_interval = poll_interval
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        self._engine = SocialRuleEngine(yaml_path)
+        self._file_signature = self._stat_signature()
+
+    @property
+    def yaml_path(self) -> str:
+        return self._engine.yaml_path
+
+    def get(self) -> SocialRuleEngine:
+        """Retourne le snapshot courant du moteur (à conserver pour la requête)."""
+        return self._engine
+
+    @property
+    def version(self) -> str:
+        """Empreinte du YAML actuellement servi."""
+        return self._engine.version
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        """Signature (mtime, taille) du YAML, None si absent."""
+        try:
+            stat = os.stat(self.yaml_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reconstruit le moteur si le contenu du YAML a changé.
+
+        Returns:
+            True si un nouveau moteur a été mis en service
+        """
+        with self._reload_lock:
+            signature = self._stat_signature()
+            if signature is None or signature == self._file_signature:
+                return False
+
+            try:
+                with open(self.yaml_path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+            except OSError as e:
+                print(f"⚠️ Lecture YAML impossible pour rechargement: {e}")
+                return False
+
+            self._file_signature = signature
+            if digest == self._engine.version:
+                return False
+
+            candidate = SocialRuleEngine(self.yaml_path)
+            validation = candidate.validate_yaml()
+            if not candidate.rules or not validation["valid"]:
+                print(f"❌ Rechargement YAML refusé: {validation['issues'][:3]}")
+                return False
+
+            # Substitution atomique : les requêtes suivantes voient le nouveau moteur
+            previous = self._engine
+            self._engine = candidate
+            previous.clear_caches()
+            print(f"🔄 Règles YAML rechargées (version {candidate.version[:12]})")
+            return True
+
+    def start_watching(self) -> None:
+        """Démarre le thread de surveillance du YAML (idempotent)."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._watcher = threading.Thread(
+            target=self._watch_loop,
+            name="rules-yaml-watcher",
+            daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        """Arrête le thread de surveillance."""
+        self._stop_event.set()
+
+    def _watch_loop(self) -> None:
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                print(f"❌ Erreur surveillance YAML: {e}")
+
+
+def get_rule_registry(yaml_path: str = "rules/social_rules.yaml",
+                      poll_interval: float = 5.0) -> RuleEngineRegistry:
+    """
+    Retourne le registre partagé par toutes les sessions du processus.
+    Le premier appel charge le moteur et démarre la surveillance du YAML.
+    """
+    def build() -> RuleEngineRegistry:
+        registry = RuleEngineRegistry(yaml_path, poll_interval)
+        registry.start_watching()
+        return registry
+
+    return shared_instance("rule_registry", build)
@@ -0,0 +1,97 @@
+"""
+==============================================================================
+SPARSE HELPERS - MATRICES CREUSES CSR POUR LE SCORING DES RÈGLES
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def build_csr(rows: Sequence[Sequence[int]],
+              weights: Optional[Sequence[Sequence[float]]] = None
+              ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Construit une matrice creuse CSR à partir de listes de postings.
+
+    Args:
+        rows: Pour chaque ligne, les colonnes non nulles
+        weights: Pour chaque ligne, les poids associés (1.0 par défaut)
+
+    Returns:
+        Tuple (indptr, indices, data)
+    """
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(r) for r in rows])
+    indices = np.fromiter((c for r in rows for c in r), dtype=np.int32, count=int(indptr[-1]))
+    if weights is None:
+        data = np.ones(indices.size, dtype=np.float32)
+    else:
+        data = np.fromiter((w for r in weights for w in r), dtype=np.float32, count=int(indptr[-1]))
+    return indptr, indices, data
+
+
+def gather_rows(indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+                row_ids: np.ndarray, owners: np.ndarray, row_weights: np.ndarray
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Déplie les lignes demandées d'une matrice CSR, sans boucle Python.
+
+    Args:
+        indptr, indices, data: Matrice CSR
+        row_ids: Lignes à lire (doublons autorisés)
+        owners: Pour chaque ligne lue, la ligne de sortie (ex: la requête)
+        row_weights: Pour chaque ligne lue, un facteur multiplicatif
+
+    Returns:
+        Tuple (lignes de sortie, colonnes, valeurs) au format coordonnées
+    """
+    starts = indptr[row_ids]
+    lengths = indptr[row_ids + 1] - starts
+    total = int(lengths.sum())
+    if not total:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float32)
+
+    # Position de chaque élément déplié dans indices/data
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+    out_rows = np.repeat(owners, lengths)
+    values = data[offsets] * np.repeat(row_weights, lengths)
+    return out_rows, indices[offsets].astype(np.int64), values
+
+
+def accumulate(out_rows: np.ndarray, cols: np.ndarray, values: np.ndarray,
+               n_rows: int, n_cols: int) -> np.ndarray:
+    """
+    Somme des coordonnées (ligne, colonne, valeur) dans une matrice dense.
+
+    Returns:
+        Matrice float32 de forme (n_rows, n_cols)
+    """
+    flat = np.bincount(out_rows * n_cols + cols, weights=values, minlength=n_rows * n_cols)
+    return flat.astype(np.float32).reshape(n_rows, n_cols)
+
+
+def top_k_rows(scores: np.ndarray, candidates: np.ndarray, top_k: int) -> List[np.ndarray]:
+    """
+    Sélectionne, ligne par ligne, les top_k colonnes candidates par score
+    décroissant (colonne la plus à gauche en cas d'égalité).
+
+    Args:
+        scores: Matrice (lignes × colonnes)
+        candidates: Masque booléen de même forme
+        top_k: Nombre maximum de colonnes par ligne
+
+    Returns:
+        Liste (une entrée par ligne) de tableaux d'indices de colonnes
+    """
+    if top_k <= 0 or not scores.size:
+        return [np.zeros(0, dtype=np.int64) for _ in range(scores.shape[0])]
+
+    masked = np.where(candidates, scores, -np.inf)
+    order = np.argsort(-masked, axis=1, kind="stable")[:, :top_k]
+    keep = np.take_along_axis(candidates, order, axis=1)
+    return [row[mask] for row, mask in zip(order, keep)]
@@ -0,0 +1,149 @@
+"""
+==============================================================================
+RULE STORE - STOCKAGE TYPÉ DES RÈGLES YAML
+VERSION : 4.1 (ACCÈS O(1) PAR ID ET PAR CHEMIN DE VALEUR)
+DATE : 18/10/2026
+==============================================================================
+"""
+
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+Value = Union[float, int, str, bool]
+
+_MISSING = object()
+
+
+@dataclass(frozen=True, slots=True)
+class Rule:
+    """Règle métier immuable (une entrée du YAML)."""
+
+    id: str
+    keywords: Tuple[str, ...]
+    valeurs: Mapping[str, Any]
+    text: Optional[str]
+    source: Optional[str]
+    derniere_maj: Optional[str]
+    normalized_keywords: Tuple[str, ...]
+    fact_line: str
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Accès façon dictionnaire, pour compatibilité avec l'ancien format."""
+        if key not in _RULE_FIELDS:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    @classmethod
+    def from_dict(cls, raw: Dict, normalized_keywords: Sequence[str], fact_line: str) -> "Rule":
+        """
+        Construit une règle depuis son entrée YAML.
+
+        Args:
+            raw: Entrée YAML (déjà validée)
+            normalized_keywords: Keywords normalisés
+            fact_line: Ligne de fait certifié prérendue
+        """
+        return cls(
+            id=raw.get("id", ""),
+            keywords=tuple(raw.get("keywords") or ()),
+            valeurs=MappingProxyType(dict(raw.get("valeurs") or {})),
+            text=raw.get("text"),
+            source=raw.get("source"),
+            derniere_maj=raw.get("derniere_maj"),
+            normalized_keywords=tuple(normalized_keywords),
+            fact_line=fact_line
+        )
+
+
+_RULE_FIELDS = frozenset(f.name for f in fields(Rule))
+
+
+class RuleStore:
+    """
+    Collection immuable des règles d'un snapshot YAML.
+    - Index id -> règle
+    - Tuple précalculé des règles vitales (ordre du YAML)
+    - Valeurs aplaties par chemin pointé ("PASS_2026.mensuel")
+    """
+
+    __slots__ = ("rules", "_by_id", "vital_rules", "_values")
+
+    def __init__(self, rules: Sequence[Rule], vital_ids: Sequence[str] = ()):
+        """
+        Indexe les règles.
+
+        Args:
+            rules: Règles dans l'ordre du YAML
+            vital_ids: Identifiants des règles toujours injectées
+        """
+        self.rules: Tuple[Rule, ...] = tuple(rules)
+        self._by_id: Dict[str, Rule] = {}
+        self._values: Dict[str, Value] = {}
+
+        for rule in self.rules:
+            self._by_id.setdefault(rule.id, rule)
+            self._flatten(rule.id, rule.valeurs)
+
+        vital = set(vital_ids)
+        self.vital_rules: Tuple[Rule, ...] = tuple(r for r in self.rules if r.id in vital)
+
+    def _flatten(self, prefix: str, valeurs: Mapping[str, Any]) -> None:
+        for key, val in valeurs.items():
+            path = f"{prefix}.{key}"
+            if isinstance(val, Mapping):
+                self._flatten(path, val)
+            else:
+                self._values[path] = val
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def __iter__(self) -> Iterator[Rule]:
+        return iter(self.rules)
+
+    def __contains__(self, rule_id: str) -> bool:
+        return rule_id in self._by_id
+
+    def get(self, rule_id: str) -> Optional[Rule]:
+        """Retourne la règle d'identifiant donné, ou None."""
+        return self._by_id.get(rule_id)
+
+    def value(self, path: str, default: Any = _MISSING) -> Value:
+        """
+        Retourne une valeur par chemin pointé, ex: value("PASS_2026.mensuel").
+
+        Args:
+            path: "<ID_REGLE>.<clé>" (clés imbriquées séparées par des points)
+            default: Valeur retournée si le chemin est absent
+
+        Returns:
+            Valeur telle que typée dans le YAML (float, int, str ou bool)
+
+        Raises:
+            KeyError: Si le chemin est absent et qu'aucun défaut n'est fourni
+        """
+        try:
+            return self._values[path]
+        except KeyError:
+            if default is _MISSING:
+                raise
+            return default
+
+    def number(self, path: str) -> float:
+        """
+        Retourne une valeur numérique par chemin pointé.
+
+        Raises:
+            KeyError: Si le chemin est absent
+            TypeError: Si la valeur n'est pas numérique
+        """
+        val = self._values[path]
+        if isinstance(val, bool) or not isinstance(val, (int, float)):
+            raise TypeError(f"Valeur non numérique: {path} = {val!r}")
+        return float(val)
+
+    def value_paths(self) -> List[str]:
+        """Liste des chemins de valeurs disponibles."""
+        return list(self._values)
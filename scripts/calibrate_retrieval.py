@@ -0,0 +1,56 @@
+import os
+import sys
+from dotenv import load_dotenv
+import numpy as np
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+# Accès aux modules de l'application (index local)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.local_index import DEFAULT_INDEX_DIR, LocalVectorIndex
+
+# ==============================================================================
+# CALIBRAGE HORS LIGNE DU TOP-K ADAPTATIF (Config.RETRIEVAL_*)
+# Usage : python scripts/calibrate_retrieval.py questions.txt
+#   questions.txt : une question réelle par ligne (export des logs)
+# ==============================================================================
+
+load_dotenv()
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", DEFAULT_INDEX_DIR)
+MAX_RANK = 8
+
+if len(sys.argv) < 2 or not GOOGLE_API_KEY:
+    print("❌ Usage : python scripts/calibrate_retrieval.py questions.txt (GOOGLE_API_KEY requis)")
+    exit()
+
+with open(sys.argv[1], "r", encoding="utf-8") as f:
+    questions = [line.strip() for line in f if line.strip()]
+
+print(f"📂 {len(questions)} questions | index local : {LOCAL_INDEX_DIR}")
+index = LocalVectorIndex(LOCAL_INDEX_DIR)
+embeddings = GoogleGenerativeAIEmbeddings(
+    model="models/gemini-embedding-001",
+    google_api_key=GOOGLE_API_KEY,
+    task_type="retrieval_query"
+)
+
+# 1. Scores des MAX_RANK premiers résultats de chaque question
+scores = np.full((len(questions), MAX_RANK), np.nan, dtype=np.float32)
+for i, question in enumerate(questions):
+    hits = index.search(embeddings.embed_query(question), k=MAX_RANK)
+    scores[i, :len(hits)] = [score for _, score in hits]
+
+# 2. Distributions par rang
+print("\n📊 Similarité par rang (p10 / p50 / p90) :")
+for rank in range(MAX_RANK):
+    p10, p50, p90 = np.nanpercentile(scores[:, rank], [10, 50, 90])
+    print(f"   Rang {rank + 1} : {p10:.3f} / {p50:.3f} / {p90:.3f}")
+
+drops = scores[:, :1] - scores[:, 1:]
+gaps = scores[:, :-1] - scores[:, 1:]
+
+# 3. Suggestions (à valider sur un échantillon annoté)
+print("\n🎯 Valeurs suggérées pour core/config.py :")
+print(f"   RETRIEVAL_MIN_SCORE = {np.nanpercentile(scores[:, 0], 5):.2f}   # p5 du meilleur résultat")
+print(f"   RETRIEVAL_MAX_SCORE_DROP = {np.nanpercentile(drops[:, 3], 75):.2f}   # p75 de l'écart top1 - top5")
+print(f"   RETRIEVAL_MAX_SCORE_GAP = {np.nanpercentile(gaps, 95):.2f}   # p95 des écarts consécutifs")
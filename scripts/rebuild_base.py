@@ -1,17 +1,28 @@
 import os
+import sys
 import time
 from dotenv import load_dotenv
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pinecone import Pinecone
 
+# Accès aux modules de l'application (index local)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.article_index import ArticleIndex, tag_chunk_articles
+from services.lexical_index import LexicalIndex
+from services.local_index import DEFAULT_INDEX_DIR, LocalVectorIndex
+
 # 1. Chargement Config
 load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = "expert-social"
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") 
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+
+# Export de l'index local (même dossier que Config.LOCAL_INDEX_DIR)
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", DEFAULT_INDEX_DIR)
+LOCAL_INDEX_INT8 = os.getenv("LOCAL_INDEX_INT8", "0") == "1"
 
 # --- SÉCURITÉ CRITIQUE (AJOUTÉE) ---
 if not PINECONE_API_KEY or not GOOGLE_API_KEY:
@@ -107,12 +118,17 @@ print(f"\n✂️  Découpage intelligent (Cela peut prendre 1-2 minutes)...")
 final_chunks = text_splitter.split_documents(documents)
 print(f"🧩 RÉSULTAT : {len(final_chunks)} blocs de connaissance haute définition.")
 
+# Articles définis / cités par chaque chunk (métadonnées Pinecone + table d'accès direct)
+for c in final_chunks:
+    tag_chunk_articles(c.metadata, c.page_content)
+print(f"🔖 {sum(1 for c in final_chunks if c.metadata['articles'])} blocs rattachés à un article.")
+
 # 5. Injection
 print("🧠 Injection dans Pinecone (C'est le moment critique)...")
 
 # Configuration explicite (Sécurisée)
 embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/gemini-embedding-001",
+    model=EMBEDDING_MODEL,
     google_api_key=GOOGLE_API_KEY, # Clé explicite
     task_type="retrieval_document"
 )
@@ -120,14 +136,51 @@ embeddings = GoogleGenerativeAIEmbeddings(
 batch_size = 50 
 total_batches = len(final_chunks) // batch_size + 1
 
+# Vecteurs conservés pour l'export local (un seul calcul d'embedding par chunk)
+export_ids, export_vectors, export_texts, export_metadatas = [], [], [], []
+
 for i in range(0, len(final_chunks), batch_size):
     batch = final_chunks[i:i + batch_size]
     try:
-        PineconeVectorStore.from_documents(batch, embeddings, index_name=PINECONE_INDEX_NAME)
+        ids = [f"chunk-{i + j:06d}" for j in range(len(batch))]
+        texts = [c.page_content for c in batch]
+        vectors = embeddings.embed_documents(texts)
+        
+        # Même format que PineconeVectorStore (texte dans la métadonnée "text")
+        index.upsert(vectors=[
+            (chunk_id, vector, {**c.metadata, "text": c.page_content})
+            for chunk_id, vector, c in zip(ids, vectors, batch)
+        ])
+        
+        export_ids.extend(ids)
+        export_vectors.extend(vectors)
+        export_texts.extend(texts)
+        export_metadatas.extend(c.metadata for c in batch)
+        
         percent = round((i / len(final_chunks)) * 100)
         print(f"   ✓ Progression : {percent}% (Lot {i//batch_size + 1}/{total_batches})")
     except Exception as e:
         print(f"   ❌ Erreur lot {i}: {e}")
         time.sleep(5) 
 
+# 6. Export de l'index local (secours / remplaçant de Pinecone)
+print(f"\n💾 Export de l'index local vers '{LOCAL_INDEX_DIR}'...")
+try:
+    local_index = LocalVectorIndex.build(
+        LOCAL_INDEX_DIR, export_ids, export_vectors, export_texts, export_metadatas,
+        model=EMBEDDING_MODEL, quantize=LOCAL_INDEX_INT8
+    )
+    print(f"✅ Index local : {len(local_index)} chunks ({local_index.manifest['n_clusters']} listes IVF).")
+    
+    # Index BM25 des mêmes chunks (recherche hybride)
+    LexicalIndex.build([c["text"] for c in local_index.chunks], local_index.version).save(LOCAL_INDEX_DIR)
+    print("✅ Index BM25 exporté (références d'articles + sigles).")
+    
+    # Table article -> chunks (questions qui citent un article)
+    article_index = ArticleIndex.build(local_index.chunks, local_index.version)
+    article_index.save(LOCAL_INDEX_DIR)
+    print(f"✅ Table des articles exportée ({len(article_index.chunk_ids)} articles).")
+except Exception as e:
+    print(f"❌ Export local impossible : {e}")
+
 print("\n🎉 MISSION ACCOMPLIE. Base reconstruite en 3072 dimensions.")
\ No newline at end of file
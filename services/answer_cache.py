@@ -0,0 +1,221 @@
+"""
+==============================================================================
+ANSWER CACHE - RÉPONSES DÉJÀ GÉNÉRÉES (EXACT + QUASI-DOUBLONS)
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from rules.engine import normalize_text
+from utils.helpers import logger, shared_instance
+
+_NUMBERS_RE = re.compile(r"\d+")
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    """Réponse rejouable telle qu'elle a été affichée."""
+    answer: str
+    debug_data: List[Dict]
+    created: float
+    similarity: float = 1.0
+
+
+@dataclass
+class _Entry:
+    answer: CachedAnswer
+    bucket: str
+    vector: Optional[np.ndarray]
+
+
+class AnswerCache:
+    """
+    Cache process des réponses Gemini, partagé par toutes les sessions.
+    - Clé exacte : question normalisée + règles matchées + hash du document
+    - Quasi-doublons (optionnel) : similarité cosinus des embeddings au-dessus
+      d'un seuil, limitée aux questions ayant les mêmes règles, le même
+      document et les mêmes nombres (10 ans ≠ 15 ans)
+    Les versions du YAML et de l'index Pinecone font partie de la clé : une
+    nouvelle version ne vide rien, les réponses des anciennes ne sont plus
+    trouvées et sortent par TTL ou LRU (un retour à l'ancienne version les
+    retrouve).
+    """
+
+    def __init__(self, ttl: float = 21600, max_entries: int = 1000,
+                 similarity_threshold: Optional[float] = 0.97):
+        """
+        Args:
+            ttl: Durée de vie d'une réponse (secondes)
+            max_entries: Nombre maximum de réponses gardées (LRU)
+            similarity_threshold: Seuil cosinus des quasi-doublons
+                (None ou >= 1 pour désactiver)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._buckets: Dict[str, Set[str]] = {}
+
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _keys(question: str, rule_ids: Sequence[str], doc_hash: str,
+              versions: Tuple[str, ...]) -> Tuple[str, str]:
+        """Clé exacte et compartiment de recherche des quasi-doublons (par version)."""
+        normalized = normalize_text(question)
+        rules_part = ",".join(rule_ids)
+        versions_part = ",".join(str(v) for v in versions)
+        bucket_source = (
+            f"{versions_part}\x00{rules_part}\x00{doc_hash}\x00"
+            f"{' '.join(_NUMBERS_RE.findall(normalized))}"
+        )
+        bucket = hashlib.sha256(bucket_source.encode("utf-8")).hexdigest()[:32]
+        exact = hashlib.sha256(f"{bucket}\x00{normalized}".encode("utf-8")).hexdigest()[:32]
+        return exact, bucket
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._buckets.get(entry.bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[entry.bucket]
+
+    def _is_fresh(self, entry: _Entry, now: float) -> bool:
+        return now - entry.answer.created <= self.ttl
+
+    @property
+    def similarity_enabled(self) -> bool:
+        return self.similarity_threshold is not None and self.similarity_threshold < 1
+
+    def lookup(self, question: str, rule_ids: Sequence[str], doc_hash: str,
+               versions: Tuple[str, ...],
+               embed: Optional[Callable[[], Sequence[float]]] = None) -> Optional[CachedAnswer]:
+        """
+        Cherche une réponse réutilisable.
+
+        Args:
+            question: Question de l'utilisateur
+            rule_ids: IDs des règles matchées (dans l'ordre)
+            doc_hash: Empreinte du document utilisateur ("" si aucun)
+            versions: Versions courantes (YAML, index Pinecone)
+            embed: Fournit l'embedding de la question, appelé seulement si
+                la clé exacte est absente et qu'un quasi-doublon est possible
+
+        Returns:
+            Réponse en cache ou None
+        """
+        exact, bucket = self._keys(question, rule_ids, doc_hash, versions)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(exact)
+            if entry is not None:
+                if self._is_fresh(entry, now):
+                    self._entries.move_to_end(exact)
+                    self.exact_hits += 1
+                    return entry.answer
+                self._drop(exact)
+
+            candidates = [
+                key for key in self._buckets.get(bucket, ())
+                if self._entries[key].vector is not None
+            ]
+
+        if not candidates or embed is None or not self.similarity_enabled:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            query_vector = self._unit(embed())
+        except Exception as e:
+            logger.warning(f"AnswerCache: embedding indisponible : {e}")
+            query_vector = None
+
+        with self._lock:
+            live = [
+                key for key in candidates
+                if key in self._entries and self._is_fresh(self._entries[key], now)
+            ]
+            if query_vector is None or not live:
+                self.misses += 1
+                return None
+
+            matrix = np.stack([self._entries[key].vector for key in live])
+            similarities = matrix @ query_vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(live[best])
+            self.similar_hits += 1
+            cached = self._entries[live[best]].answer
+            return CachedAnswer(cached.answer, cached.debug_data, cached.created,
+                                float(similarities[best]))
+
+    def store(self, question: str, rule_ids: Sequence[str], doc_hash: str,
+              versions: Tuple[str, ...], answer: str, debug_data: List[Dict],
+              vector: Optional[Sequence[float]] = None) -> None:
+        """
+        Enregistre une réponse complète.
+
+        Args:
+            question, rule_ids, doc_hash, versions: Voir lookup()
+            answer: Réponse affichée
+            debug_data: Sources affichées en mode admin
+            vector: Embedding de la question (active les quasi-doublons)
+        """
+        exact, bucket = self._keys(question, rule_ids, doc_hash, versions)
+        unit = self._unit(vector) if vector is not None and self.similarity_enabled else None
+
+        with self._lock:
+            self._drop(exact)
+            self._entries[exact] = _Entry(CachedAnswer(answer, debug_data, time.time()), bucket, unit)
+            self._buckets.setdefault(bucket, set()).add(exact)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> Optional[np.ndarray]:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        return array / norm if norm else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict:
+        """Compteurs de hits du cache."""
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+def get_answer_cache(ttl: float = 21600, max_entries: int = 1000,
+                     similarity_threshold: Optional[float] = 0.97) -> AnswerCache:
+    """Retourne le cache de réponses partagé par toutes les sessions du processus."""
+    return shared_instance("answer_cache", lambda: AnswerCache(ttl, max_entries, similarity_threshold))
@@ -0,0 +1,144 @@
+"""
+==============================================================================
+ARTICLE INDEX - ACCÈS DIRECT AUX ARTICLES CITÉS (CODE DU TRAVAIL / CSS)
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import json
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from services.lexical_index import ARTICLE_RE, extract_article_ids
+from utils.helpers import logger, shared_instance
+
+# Article défini par le chunk : le découpage sur "Article " place l'en-tête
+# en tête de chunk (ou en début de ligne)
+_HEADING_RE = re.compile(r"(?:^|\n)\s*Article\s+" + ARTICLE_RE.pattern)
+
+
+def extract_defined_articles(text: str) -> List[str]:
+    """Articles dont le chunk contient l'en-tête ("Article L1234-9 ...")."""
+    if not text:
+        return []
+    seen: Dict[str, None] = {}
+    for letter, number in _HEADING_RE.findall(text):
+        seen.setdefault(f"{letter.upper()}{number}", None)
+    return list(seen)
+
+
+def tag_chunk_articles(metadata: Dict, text: str) -> None:
+    """
+    Étiquette un chunk à l'ingestion (métadonnées Pinecone et export local).
+    - articles : articles définis par le chunk
+    - articles_cites : articles simplement mentionnés
+    """
+    defined = extract_defined_articles(text)
+    metadata["articles"] = defined
+    metadata["articles_cites"] = [a for a in extract_article_ids(text) if a not in defined]
+
+
+class ArticleIndex:
+    """
+    Table article -> chunks de l'index local. Les chunks qui définissent
+    l'article passent avant ceux qui le citent. Une question qui nomme un
+    article obtient ces chunks par simple lecture de dictionnaire, avant
+    toute recherche sémantique.
+    """
+
+    FILE_NAME = "articles.json"
+
+    def __init__(self, chunk_ids: Dict[str, List[str]], version: str = ""):
+        self.chunk_ids = chunk_ids
+        self.version = version
+
+    @classmethod
+    def build(cls, chunks: Sequence[Dict], version: str = "") -> "ArticleIndex":
+        """
+        Construit la table depuis les chunks exportés (id, text, metadata).
+
+        Args:
+            chunks: Chunks de l'index local, dans l'ordre des lignes
+            version: Version de l'export local
+        """
+        defining: Dict[str, List[str]] = {}
+        citing: Dict[str, List[str]] = {}
+        for chunk in chunks:
+            metadata = chunk.get("metadata", {})
+            defined = metadata.get("articles")
+            if defined is None:
+                # Export antérieur à l'étiquetage : extraction à la volée
+                defined = extract_defined_articles(chunk["text"])
+                cited = [a for a in extract_article_ids(chunk["text"]) if a not in defined]
+            else:
+                cited = metadata.get("articles_cites", [])
+            for article_id in defined:
+                defining.setdefault(article_id, []).append(chunk["id"])
+            for article_id in cited:
+                citing.setdefault(article_id, []).append(chunk["id"])
+
+        chunk_ids = {
+            article_id: defining.get(article_id, []) + citing.get(article_id, [])
+            for article_id in set(defining) | set(citing)
+        }
+        return cls(chunk_ids, version)
+
+    def save(self, directory: str) -> None:
+        tmp_path = os.path.join(directory, self.FILE_NAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "articles": self.chunk_ids}, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(directory, self.FILE_NAME))
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["ArticleIndex"]:
+        path = os.path.join(directory, cls.FILE_NAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("articles", {}), data.get("version", ""))
+
+    def lookup(self, article_ids: Sequence[str], per_article: int = 2,
+               limit: int = 3) -> List[Tuple[str, str]]:
+        """
+        Chunks des articles demandés.
+
+        Args:
+            article_ids: Articles normalisés ("L1237-19"), par priorité
+            per_article: Chunks maximum par article
+            limit: Chunks maximum au total
+
+        Returns:
+            Couples (article, id du chunk), sans doublon de chunk
+        """
+        found: List[Tuple[str, str]] = []
+        seen = set()
+        for article_id in article_ids:
+            for chunk_id in self.chunk_ids.get(article_id, ())[:per_article]:
+                if chunk_id not in seen:
+                    seen.add(chunk_id)
+                    found.append((article_id, chunk_id))
+                    if len(found) >= limit:
+                        return found
+        return found
+
+
+def get_article_index(local_index) -> Optional[ArticleIndex]:
+    """
+    Table des articles associée à un index local (chargée depuis l'export,
+    ou construite au premier appel si l'export n'en contient pas).
+    """
+    def load() -> Optional[ArticleIndex]:
+        try:
+            index = ArticleIndex.load(local_index.directory)
+            if index is None or index.version != local_index.version:
+                logger.info("Table des articles absente de l'export : construction en mémoire")
+                index = ArticleIndex.build(local_index.chunks, local_index.version)
+            return index
+        except Exception as e:
+            logger.error(f"Table des articles indisponible : {e}")
+            return None
+
+    return shared_instance(("article_index", local_index.directory), load, version=local_index.version)
@@ -0,0 +1,183 @@
+"""
+==============================================================================
+CONTEXT PACKER - CONTEXTE RAG SOUS BUDGET DE TOKENS (FUSION + MMR)
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Sequence
+
+from rules.engine import normalize_text
+
+# Gemini compte environ 1 token pour 4 caractères de français
+CHARS_PER_TOKEN = 4
+
+# Recouvrement maximal laissé par le découpage (chunk_overlap = 200)
+MAX_OVERLAP_CHARS = 400
+OVERLAP_PROBE_CHARS = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation rapide du nombre de tokens d'un texte."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class _Piece:
+    """Extrait candidat : un ou plusieurs chunks contigus d'une même source."""
+    name: str
+    source: str
+    text: str
+    rank: int
+    terms: FrozenSet[str] = field(default=frozenset())
+
+
+@dataclass
+class PackedContext:
+    """Résultat de l'assemblage du contexte."""
+    text: str
+    debug_data: List[Dict]
+    truncated: bool
+    tokens: int
+    chunks_in: int
+    pieces_used: int
+
+
+def _merge_text(first: str, second: str) -> Optional[str]:
+    """
+    Fusionne deux chunks d'une même source s'ils se recouvrent (ou si l'un
+    contient l'autre). Retourne None s'ils sont disjoints.
+    """
+    if second in first:
+        return first
+    if first in second:
+        return second
+
+    probe = second[:OVERLAP_PROBE_CHARS]
+    if not probe:
+        return None
+    window_start = max(0, len(first) - MAX_OVERLAP_CHARS)
+    pos = first.find(probe, window_start)
+    while pos != -1:
+        overlap = len(first) - pos
+        if second.startswith(first[pos:]):
+            return first + second[overlap:]
+        pos = first.find(probe, pos + 1)
+    return None
+
+
+def _merge_pieces(pieces: List[_Piece]) -> List[_Piece]:
+    """Regroupe les chunks adjacents ou recouvrants d'une même source."""
+    merged: List[_Piece] = []
+    for piece in pieces:
+        for target in merged:
+            if target.source != piece.source:
+                continue
+            text = _merge_text(target.text, piece.text) or _merge_text(piece.text, target.text)
+            if text is not None:
+                target.text = text
+                target.rank = min(target.rank, piece.rank)
+                break
+        else:
+            merged.append(piece)
+    return merged
+
+
+def _similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Coupe un texte à max_chars caractères, sur une fin de mot si possible."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max(max_chars - 1, 0)]
+    space = cut.rfind(" ")
+    if space > len(cut) // 2:
+        cut = cut[:space]
+    return cut + "…"
+
+
+def pack_context(docs: Sequence, max_tokens: int = 2500, mmr_lambda: float = 0.7) -> PackedContext:
+    """
+    Assemble le contexte documentaire du prompt.
+    1. Fusion des chunks recouvrants d'une même source (chevauchement du splitter)
+    2. Sélection par Maximal Marginal Relevance : pertinence (rang de la
+       recherche) moins redondance avec les extraits déjà retenus
+    3. Respect strict du budget de tokens (l'extrait le plus pertinent est
+       toujours gardé, coupé si besoin), assemblage en un seul join
+
+    Args:
+        docs: Documents classés par la recherche (le plus pertinent d'abord)
+        max_tokens: Budget de tokens du contexte
+        mmr_lambda: Poids de la pertinence face à la diversité (0..1)
+
+    Returns:
+        PackedContext
+    """
+    pieces = [
+        _Piece(
+            name=d.metadata.get('clean_name', 'Source'),
+            source=f"{d.metadata.get('source', '')}|{d.metadata.get('page', '')}",
+            text=d.page_content,
+            rank=rank
+        )
+        for rank, d in enumerate(docs)
+        if d.page_content
+    ]
+    pieces = _merge_pieces(pieces)
+    for piece in pieces:
+        piece.terms = frozenset(w for w in normalize_text(piece.text).split() if len(w) >= 3)
+
+    n_docs = max(len(docs), 1)
+    remaining = list(pieces)
+    selected: List[_Piece] = []
+    blocks: List[str] = []
+    used_tokens = 0
+    truncated = False
+
+    while remaining:
+        def mmr(piece: _Piece) -> float:
+            relevance = 1.0 - piece.rank / n_docs
+            redundancy = max((_similarity(piece.terms, s.terms) for s in selected), default=0.0)
+            return mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+
+        best = max(remaining, key=lambda p: (mmr(p), -p.rank))
+        remaining.remove(best)
+
+        block = f"DOCUMENT : {best.name}\n{best.text}\n\n"
+        block_tokens = estimate_tokens(block)
+        if used_tokens + block_tokens > max_tokens:
+            truncated = True
+            if selected:
+                # Un extrait plus court peut encore tenir dans le budget
+                continue
+            # Extrait le plus pertinent plus long que tout le budget : gardé,
+            # coupé au budget, plutôt qu'un contexte vide
+            best.text = _truncate(best.text, max_tokens * CHARS_PER_TOKEN - len(block) + len(best.text))
+            block = f"DOCUMENT : {best.name}\n{best.text}\n\n"
+            block_tokens = estimate_tokens(block)
+
+        selected.append(best)
+        blocks.append(block)
+        used_tokens += block_tokens
+
+    debug_data: List[Dict] = []
+    seen = set()
+    for piece in selected:
+        if piece.name not in seen:
+            seen.add(piece.name)
+            debug_data.append({"name": piece.name, "extract": piece.text})
+
+    return PackedContext(
+        text="".join(blocks),
+        debug_data=debug_data,
+        truncated=truncated,
+        tokens=used_tokens,
+        chunks_in=len(docs),
+        pieces_used=len(selected)
+    )
@@ -0,0 +1,237 @@
+"""
+==============================================================================
+EMBEDDING CACHE - VECTEURS DE REQUÊTES (LRU MÉMOIRE + DISQUE MMAP)
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from utils.helpers import logger
+
+try:
+    import fcntl  # Verrou inter-processus des écritures (POSIX)
+except ImportError:
+    fcntl = None
+
+# Taille de l'empreinte de clé stockée en tête de chaque enregistrement
+KEY_BYTES = 16
+
+
+class EmbeddingCache:
+    """
+    Cache à deux niveaux des embeddings de requêtes, clé = (modèle, requête
+    normalisée).
+    - Niveau 1 : LRU en mémoire du processus
+    - Niveau 2 : fichier en ajout seul, lu par memory-mapping (les vecteurs
+      sont servis sans copie). Chaque enregistrement porte sa clé à côté du
+      vecteur et la clé est vérifiée à la lecture : un enregistrement décalé
+      (écriture interrompue, processus concurrent) n'est jamais servi
+    Les compteurs de hits permettent de suivre l'efficacité du cache.
+    """
+
+    RECORDS_FILE = "records.bin"
+    META_FILE = "meta.json"
+    # Ancien format (vecteurs + index séparés), supprimé à l'ouverture
+    LEGACY_FILES = ("vectors.f32", "index.tsv")
+
+    def __init__(self, model: str, cache_dir: str = "cache/embeddings", memory_size: int = 2048):
+        """
+        Ouvre (ou crée) le cache disque du modèle.
+
+        Args:
+            model: Nom du modèle d'embedding (fait partie de la clé)
+            cache_dir: Dossier racine du cache disque (partageable entre processus)
+            memory_size: Nombre de vecteurs gardés dans le LRU mémoire
+        """
+        self.model = model
+        self.memory_size = memory_size
+        self.directory = os.path.join(cache_dir, re.sub(r"\W+", "_", model).strip("_"))
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._rows: Dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._dtype: Optional[np.dtype] = None
+        self._n_rows = 0
+        self._mmap: Optional[np.memmap] = None
+        self._disk_enabled = True
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _set_dim(self, dim: int) -> None:
+        self._dim = dim
+        self._dtype = np.dtype([("key", np.uint8, (KEY_BYTES,)), ("vector", "<f4", (dim,))])
+
+    def _load(self) -> None:
+        """Ouvre le cache disque et indexe les enregistrements complets."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for name in self.LEGACY_FILES:
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            if not os.path.exists(self._path(self.META_FILE)):
+                return
+
+            with open(self._path(self.META_FILE), "r", encoding="utf-8") as f:
+                self._set_dim(int(json.load(f)["dim"]))
+            self._refresh()
+            logger.info(f"EmbeddingCache: {len(self._rows)} vecteurs sur disque ({self.model})")
+        except Exception as e:
+            logger.warning(f"EmbeddingCache: cache disque désactivé : {e}")
+            self._disk_enabled = False
+            self._rows = {}
+
+    def _refresh(self) -> None:
+        """
+        Indexe les enregistrements ajoutés depuis la dernière lecture (y compris
+        par d'autres processus). Un enregistrement incomplet en fin de fichier
+        est ignoré (verrou tenu).
+        """
+        path = self._path(self.RECORDS_FILE)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        n_rows = size // self._dtype.itemsize
+        if n_rows <= self._n_rows:
+            return
+        self._mmap = np.memmap(path, dtype=self._dtype, mode="r", shape=(n_rows,))
+        keys = self._mmap["key"][self._n_rows:]
+        for offset, digest in enumerate(keys):
+            self._rows.setdefault(digest.tobytes().hex(), self._n_rows + offset)
+        self._n_rows = n_rows
+
+    def key(self, normalized_query: str) -> str:
+        """Clé de cache d'une requête déjà normalisée."""
+        digest = hashlib.sha256(f"{self.model}\x00{normalized_query}".encode("utf-8")).hexdigest()
+        return digest[:2 * KEY_BYTES]
+
+    def get(self, normalized_query: str) -> Optional[np.ndarray]:
+        """
+        Cherche le vecteur d'une requête normalisée.
+
+        Args:
+            normalized_query: Requête normalisée (rules.engine.normalize_text)
+
+        Returns:
+            Vecteur float32 (lecture seule) ou None
+        """
+        key = self.key(normalized_query)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+            vector = self._read(key)
+            if vector is None and self._disk_enabled and self._dtype is not None:
+                # Peut-être écrit entre-temps par un autre processus
+                try:
+                    self._refresh()
+                    vector = self._read(key)
+                except Exception as e:
+                    logger.warning(f"EmbeddingCache: relecture disque impossible : {e}")
+            if vector is not None:
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return vector
+
+            self.misses += 1
+            return None
+
+    def _read(self, key: str) -> Optional[np.ndarray]:
+        """Vecteur disque de la clé, seulement si l'enregistrement porte cette clé (verrou tenu)."""
+        row = self._rows.get(key)
+        if row is None or self._mmap is None:
+            return None
+        record = self._mmap[row]
+        if record["key"].tobytes().hex() != key:
+            logger.warning(f"EmbeddingCache: enregistrement {row} incohérent, ignoré")
+            del self._rows[key]
+            return None
+        return record["vector"]
+
+    def put(self, normalized_query: str, vector: Sequence[float]) -> None:
+        """
+        Enregistre le vecteur d'une requête (mémoire + disque).
+
+        Args:
+            normalized_query: Requête normalisée
+            vector: Embedding renvoyé par le modèle
+        """
+        key = self.key(normalized_query)
+        array = np.asarray(vector, dtype=np.float32)
+        array.setflags(write=False)
+
+        with self._lock:
+            self._remember(key, array)
+            if not self._disk_enabled or key in self._rows:
+                return
+            try:
+                if self._dim is None:
+                    self._set_dim(int(array.size))
+                    with open(self._path(self.META_FILE), "w", encoding="utf-8") as f:
+                        json.dump({"model": self.model, "dim": self._dim}, f)
+                if array.size != self._dim:
+                    return
+
+                record = np.zeros(1, dtype=self._dtype)
+                record["key"][0] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+                record["vector"][0] = array
+
+                # Un seul write par enregistrement, sous verrou exclusif : les
+                # processus qui partagent le dossier n'entrelacent pas leurs
+                # écritures, et une fin de fichier incomplète (écriture
+                # interrompue) est coupée avant l'ajout pour garder l'alignement
+                with open(self._path(self.RECORDS_FILE), "ab") as f:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_EX)
+                    try:
+                        size = f.seek(0, os.SEEK_END)
+                        if size % self._dtype.itemsize:
+                            size -= size % self._dtype.itemsize
+                            f.truncate(size)
+                        f.write(record.tobytes())
+                        f.flush()
+                    finally:
+                        if fcntl is not None:
+                            fcntl.flock(f, fcntl.LOCK_UN)
+                self._rows[key] = size // self._dtype.itemsize
+                self._refresh()
+            except Exception as e:
+                logger.warning(f"EmbeddingCache: écriture disque impossible : {e}")
+                self._disk_enabled = False
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """Compteurs de hits du cache."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._rows),
+        }
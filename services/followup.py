@@ -0,0 +1,111 @@
+"""
+==============================================================================
+FOLLOW-UP - RÉUTILISATION DU CONTEXTE DU TOUR PRÉCÉDENT
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import FrozenSet, List, Optional, Sequence
+
+import numpy as np
+
+from rules.engine import normalize_text
+from services.lexical_index import extract_article_ids, reciprocal_rank_fusion
+
+# Débuts de question qui prolongent la précédente ("et pour 15 ans ?")
+_CONTINUATION_MARKERS = (
+    "et ", "mais ", "si ", "pour ", "dans ce cas", "meme question", "idem", "alors ",
+    "et si", "quid"
+)
+
+
+@dataclass
+class RetrievalMemory:
+    """Dernière recherche documentaire de la session (st.session_state)."""
+    query: str
+    embedding: Optional[List[float]]
+    docs: List
+    rule_ids: FrozenSet[str]
+    created: float = field(default_factory=time.time)
+    reuses: int = 0
+
+    @property
+    def articles(self) -> FrozenSet[str]:
+        """Articles présents dans les chunks conservés."""
+        found = set()
+        for doc in self.docs:
+            found.update(extract_article_ids(doc.page_content))
+        return frozenset(found)
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    va = np.asarray(a, dtype=np.float32)
+    vb = np.asarray(b, dtype=np.float32)
+    norm = float(np.linalg.norm(va) * np.linalg.norm(vb))
+    return float(va @ vb) / norm if norm else 0.0
+
+
+def _is_elliptic(query: str, max_words: int) -> bool:
+    """Question courte qui s'appuie sur la précédente."""
+    normalized = normalize_text(query)
+    return len(normalized.split()) <= max_words and normalized.startswith(_CONTINUATION_MARKERS)
+
+
+def follow_up_reason(memory: Optional[RetrievalMemory], query: str, rule_ids: FrozenSet[str],
+                     embedding: Optional[Sequence[float]] = None,
+                     similarity_threshold: float = 0.85, max_age: float = 900,
+                     max_reuses: int = 3, max_words: int = 12) -> Optional[str]:
+    """
+    Indique si la question prolonge le tour précédent (contexte réutilisable).
+    La règle YAML décisive ne doit pas avoir changé (ou être absente), puis :
+    - Question elliptique courte (vérifiable sans embedding)
+    - Sinon, similarité cosinus des embeddings au-dessus du seuil
+    Partager la même règle ne suffit pas : "indemnité" après "calcul indemnité
+    licenciement" garde la règle mais élargit la question.
+    Un article cité absent du contexte conservé impose une nouvelle recherche.
+
+    Args:
+        memory: Dernière recherche de la session
+        query: Nouvelle question
+        rule_ids: Règle décisive (meilleur score hors vitales) de la question
+        embedding: Embedding de la question (None = critères sans embedding)
+        similarity_threshold, max_age, max_reuses, max_words: Seuils (Config.FOLLOWUP_*)
+
+    Returns:
+        Raison de la réutilisation, ou None si une recherche est nécessaire
+    """
+    if memory is None or not memory.docs:
+        return None
+    if time.time() - memory.created > max_age or memory.reuses >= max_reuses:
+        return None
+    if not set(extract_article_ids(query)) <= memory.articles:
+        return None
+
+    if rule_ids and rule_ids != memory.rule_ids:
+        return None
+    if _is_elliptic(query, max_words):
+        return "question elliptique"
+    if embedding is not None and memory.embedding is not None:
+        similarity = _cosine(embedding, memory.embedding)
+        if similarity >= similarity_threshold:
+            return f"similarité {similarity:.2f}"
+    return None
+
+
+def rerank_for_follow_up(docs: Sequence, query: str) -> List:
+    """
+    Re-classe les chunks conservés pour la nouvelle question : recouvrement
+    de vocabulaire avec la question, fusionné (RRF) avec l'ordre d'origine.
+    """
+    query_terms = {w for w in normalize_text(query).split() if len(w) >= 3}
+    overlaps = [
+        len(query_terms & set(normalize_text(doc.page_content).split()))
+        for doc in docs
+    ]
+    original = list(range(len(docs)))
+    by_overlap = sorted(original, key=lambda i: (-overlaps[i], i))
+    fused = reciprocal_rank_fusion([[str(i) for i in by_overlap], [str(i) for i in original]])
+    return [docs[int(i)] for i, _ in fused]
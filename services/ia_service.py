@@ -1,58 +1,416 @@
+import hashlib
 import os
-import streamlit as st
+import threading
+import time
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+from langchain_core.documents import Document
 from langchain_pinecone import PineconeVectorStore
-from utils.helpers import clean_source_name, logger  # ✅ Import centralisé
+from pinecone import Pinecone
+from rules.engine import normalize_text
+from services.article_index import get_article_index
+from services.embedding_cache import EmbeddingCache
+from services.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from services.local_index import DEFAULT_INDEX_DIR, get_local_index
+from services.retrieval import adaptive_cut
+from utils.helpers import clean_source_name, logger, shared_instance  # ✅ Import centralisé
+
+GEMINI_MODEL = "gemini-2.0-flash"
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+INDEX_NAME = "expert-social"
+
+
+class _ClientPool:
+    """
+    Clients Gemini / Pinecone partagés par toutes les sessions du processus.
+    Construits une seule fois (TLS, describe_index Pinecone) puis réutilisés :
+    les clients sous-jacents gardent leurs connexions HTTP/gRPC ouvertes et
+    sont sûrs en lecture concurrente. Un client en échec est jeté et
+    reconstruit au prochain appel.
+    """
+
+    def __init__(self, google_api_key, pinecone_api_key, index_name,
+                 cache_dir="cache/embeddings", cache_size=2048):
+        self.google_api_key = google_api_key
+        self.pinecone_api_key = pinecone_api_key
+        self.index_name = index_name
+        self.embedding_cache = EmbeddingCache(EMBEDDING_MODEL, cache_dir, cache_size)
+        self._lock = threading.Lock()
+        self._embeddings = None
+        self._index = None
+        self._vectorstore = None
+        self._llm = None
+        self._fallback_llm = None
+        self._index_version = (None, 0.0)
+
+    def embeddings(self):
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    self._embeddings = GoogleGenerativeAIEmbeddings(
+                        model=EMBEDDING_MODEL,
+                        google_api_key=self.google_api_key,
+                        task_type="retrieval_query"
+                    )
+        return self._embeddings
+
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = Pinecone(api_key=self.pinecone_api_key).Index(self.index_name)
+        return self._index
+
+    def vectorstore(self):
+        if self._vectorstore is None:
+            embeddings = self.embeddings()
+            index = self.index()
+            with self._lock:
+                if self._vectorstore is None:
+                    self._vectorstore = PineconeVectorStore(index=index, embedding=embeddings)
+        return self._vectorstore
+
+    def index_version(self, max_age):
+        """
+        Empreinte du contenu de l'index (nombre de vecteurs par namespace),
+        relue au plus toutes les max_age secondes. En cas d'échec, la
+        dernière valeur valide est rendue (None si aucune) sans être
+        re-datée : la lecture est retentée au prochain appel.
+        """
+        version, checked_at = self._index_version
+        if time.time() - checked_at < max_age:
+            return version
+        try:
+            stats = self.index().describe_index_stats().to_dict()
+            namespaces = stats.get("namespaces") or {}
+            version = f"{stats.get('total_vector_count', 0)}:" + ",".join(
+                f"{name}={ns.get('vector_count', 0)}" for name, ns in sorted(namespaces.items())
+            )
+        except Exception as e:
+            logger.warning(f"IAService: version de l'index indisponible : {e}")
+            return version
+        self._index_version = (version, time.time())
+        return version
+
+    def known_index_version(self):
+        """Dernière version relue de l'index, sans appel réseau (None si jamais lue)."""
+        return self._index_version[0]
+
+    def llm(self):
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    self._llm = self._build_llm(GEMINI_MODEL)
+        return self._llm
+
+    def fallback_llm(self, model):
+        """Modèle de secours, plus léger (construit au premier besoin)."""
+        if self._fallback_llm is None:
+            with self._lock:
+                if self._fallback_llm is None:
+                    self._fallback_llm = self._build_llm(model)
+        return self._fallback_llm
+
+    def _build_llm(self, model):
+        return ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=self.google_api_key,
+            temperature=0,
+            streaming=True,
+            # Une seule relance interne : délais et secours gérés par services.llm_guard
+            max_retries=1
+        )
+
+    def reset(self, *clients):
+        """Jette les clients indiqués ("embeddings", "vectorstore", "llm")."""
+        with self._lock:
+            for name in clients:
+                setattr(self, f"_{name}", None)
+            # Le vectorstore embarque le client d'embeddings et l'index
+            if "embeddings" in clients or "index" in clients:
+                self._vectorstore = None
+        logger.warning(f"IAService: clients réinitialisés ({', '.join(clients)})")
+
+    def warm_up(self):
+        """Ouvre les connexions (TLS, describe_index) avant la première question."""
+        try:
+            self.llm()
+            self.vectorstore()
+            self.embeddings().embed_query("warm-up")
+            logger.info("IAService: clients Gemini / Pinecone préchauffés")
+        except Exception as e:
+            logger.warning(f"IAService: préchauffage incomplet : {e}")
+
+
+def get_client_pool(google_api_key, pinecone_api_key, index_name=INDEX_NAME,
+                    cache_dir="cache/embeddings", cache_size=2048):
+    """
+    Retourne le pool de clients du processus pour ces identifiants.
+    Le premier appel lance le préchauffage en arrière-plan (les paramètres
+    du cache d'embeddings sont ceux de ce premier appel).
+    """
+    def build():
+        pool = _ClientPool(google_api_key, pinecone_api_key, index_name, cache_dir, cache_size)
+        if google_api_key and pinecone_api_key:
+            threading.Thread(target=pool.warm_up, name="ia-warm-up", daemon=True).start()
+        return pool
+
+    return shared_instance(("ia_client_pool", google_api_key, pinecone_api_key, index_name), build)
+
 
 class IAService:
-    def __init__(self):
+    def __init__(self, config=None):
+        """
+        Args:
+            config: Configuration de l'application (core.config.Config) ;
+                valeurs par défaut si absente (scripts, tests hors ligne)
+        """
         # Initialisation des clés et modèles
         self.google_api_key = os.getenv("GOOGLE_API_KEY")
         self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
-        self.index_name = "expert-social"
-        
+        self.index_name = INDEX_NAME
+
         if not self.google_api_key or not self.pinecone_api_key:
             logger.error("IAService: Clés API manquantes (Google ou Pinecone)")
 
-    def get_llm(self):
-        """Retourne l'instance du modèle Gemini 2.0 Flash"""
-        return ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash", # ✅ Conforme à vos instructions de sauvegarde
-            google_api_key=self.google_api_key,
-            temperature=0,
-            streaming=True
+        # Paramètres du cache d'embeddings
+        cache_dir = getattr(config, "EMBEDDING_CACHE_DIR", "cache/embeddings")
+        cache_size = getattr(config, "EMBEDDING_CACHE_SIZE", 2048)
+
+        # Backend vectoriel : "pinecone" (index local en secours) ou "local"
+        self.vector_backend = getattr(config, "VECTOR_BACKEND", "pinecone")
+        self.local_index_dir = getattr(config, "LOCAL_INDEX_DIR", DEFAULT_INDEX_DIR)
+        self.local_index_fallback = getattr(config, "LOCAL_INDEX_FALLBACK", True)
+
+        # Recherche hybride : BM25 sur les chunks exportés + vectoriel, fusion RRF
+        self.hybrid_search = getattr(config, "HYBRID_SEARCH_ENABLED", True)
+        self.hybrid_candidates = getattr(config, "HYBRID_CANDIDATES", 20)
+        self.rrf_k = getattr(config, "RRF_K", 60)
+
+        # Top-k adaptatif selon les scores de similarité (seuils calibrés hors ligne)
+        self.adaptive_k = getattr(config, "RETRIEVAL_ADAPTIVE_K", True)
+        self.adaptive_params = {
+            "base_k": getattr(config, "RETRIEVAL_BASE_K", 4),
+            "min_score": getattr(config, "RETRIEVAL_MIN_SCORE", 0.55),
+            "max_drop": getattr(config, "RETRIEVAL_MAX_SCORE_DROP", 0.12),
+            "max_gap": getattr(config, "RETRIEVAL_MAX_SCORE_GAP", 0.06),
+            "spread_sources": getattr(config, "RETRIEVAL_SPREAD_SOURCES", 3),
+        }
+
+        # Routage par catégorie : repli sur l'index complet sous ce nombre de résultats
+        self.routing_min_results = getattr(config, "ROUTING_MIN_RESULTS", 2)
+
+        # Articles cités : chunks lus par identifiant avant la recherche sémantique
+        self.article_lookup = getattr(config, "ARTICLE_LOOKUP_ENABLED", True)
+        self.article_lookup_max = getattr(config, "ARTICLE_LOOKUP_MAX", 3)
+
+        # Modèle de secours de la génération (vide = pas de secours)
+        self.fallback_model = getattr(config, "LLM_FALLBACK_MODEL", "")
+
+        # ✅ Clients partagés entre sessions (pas de reconstruction par question)
+        self._pool = get_client_pool(
+            self.google_api_key, self.pinecone_api_key, self.index_name, cache_dir, cache_size
+        )
+
+    def get_llm(self, fallback: bool = False):
+        """Retourne l'instance partagée de Gemini 2.0 Flash (ou du modèle de secours)"""
+        if fallback and self.fallback_model:
+            return self._pool.fallback_llm(self.fallback_model)
+        return self._pool.llm()
+
+    def reset_llm(self, fallback: bool = False):
+        """À appeler après un échec de génération : le client sera reconstruit"""
+        self._pool.reset("fallback_llm" if fallback else "llm")
+
+    def embed_query(self, query: str):
+        """
+        Embedding de la requête, servi par le cache (mémoire puis disque)
+        quand une question équivalente a déjà été posée.
+        """
+        normalized = normalize_text(query)
+        cache = self._pool.embedding_cache
+        if normalized:
+            vector = cache.get(normalized)
+            if vector is not None:
+                return vector.tolist()
+
+        vector = self._pool.embeddings().embed_query(query)
+        if normalized:
+            cache.put(normalized, vector)
+        return vector
+
+    def index_version(self, max_age: float = 300):
+        """Version courante de l'index vectoriel (pour invalider les caches)"""
+        if self.vector_backend == "local":
+            local_index = get_local_index(self.local_index_dir)
+            if local_index is not None:
+                return f"local:{local_index.version}"
+        return self._pool.index_version(max_age)
+
+    def known_index_version(self):
+        """Version de l'index déjà connue du processus (aucune attente réseau), ou None"""
+        if self.vector_backend == "local":
+            local_index = get_local_index(self.local_index_dir)
+            if local_index is not None:
+                return f"local:{local_index.version}"
+        return self._pool.known_index_version()
+
+    def embedding_cache_stats(self):
+        """Compteurs de hits du cache d'embeddings (process entier)"""
+        return self._pool.embedding_cache.stats()
+
+    def search_documents(self, query: str, k: int = None, embedding=None, categories=None,
+                         articles=None):
+        """
+        Recherche les documents pertinents dans Pinecone (ou l'index local).
+        L'embedding peut être fourni s'il a déjà été calculé (étape parallèle).
+        Si des catégories sont données (routage), seule cette partition est
+        interrogée, avec repli sur l'index complet si elle répond trop peu.
+        Les articles cités (question, sources YAML) sont lus directement et
+        placés en tête ; la recherche sémantique complète le reste.
+        """
+        k = k or 8
+        direct_docs = self.lookup_articles(articles) if articles and self.article_lookup else []
+
+        docs = []
+        if len(direct_docs) < k:
+            docs = self._search(query, k, embedding, categories)
+            if categories and len(docs) < self.routing_min_results:
+                logger.info(f"IAService: routage {categories} insuffisant, repli sur l'index complet")
+                docs = self._search(query, k, embedding, None)
+        if direct_docs:
+            direct_texts = {d.page_content for d in direct_docs}
+            docs = direct_docs + [d for d in docs if d.page_content not in direct_texts]
+            docs = docs[:k]
+
+        # ✅ Application du nettoyage centralisé sur chaque document trouvé
+        for doc in docs:
+            raw_path = doc.metadata.get('source', 'Inconnu')
+            category = doc.metadata.get('category', 'AUTRE')
+            # Utilisation de la fonction importée de utils.helpers
+            doc.metadata['clean_name'] = clean_source_name(raw_path, category)
+
+        return docs
+
+    def lookup_articles(self, article_ids):
+        """
+        Chunks des articles cités, lus dans la table article -> chunks de
+        l'export local (aucun appel réseau). [] si pas d'export ou article
+        inconnu : la recherche sémantique prend alors le relais.
+        """
+        local_index = get_local_index(self.local_index_dir)
+        if local_index is None:
+            return []
+        article_index = get_article_index(local_index)
+        if article_index is None:
+            return []
+
+        docs = []
+        for article_id, chunk_id in article_index.lookup(article_ids, limit=self.article_lookup_max):
+            row = local_index.row_of.get(chunk_id)
+            if row is None:
+                continue
+            doc = self._local_document(local_index, row, 1.0)
+            doc.metadata.update(match="article", article=article_id)
+            docs.append(doc)
+        return docs
+
+    def _search(self, query: str, k: int, embedding, categories):
+        """Recherche hybride (vectoriel + BM25) puis top-k adaptatif"""
+        lexical_docs = self._search_lexical(query, categories) if self.hybrid_search else []
+        # Plus de candidats vectoriels quand la fusion va re-classer
+        vector_k = max(k, self.hybrid_candidates) if lexical_docs else k
+
+        docs = None
+        if self.vector_backend == "local":
+            docs = self._search_local(query, vector_k, embedding, categories)
+        if docs is None:
+            docs = self._search_pinecone(query, vector_k, embedding, categories)
+        if docs is None and self.vector_backend != "local" and self.local_index_fallback:
+            docs = self._search_local(query, vector_k, embedding, categories)
+            if docs is not None:
+                logger.warning("IAService: Pinecone indisponible, réponse depuis l'index local")
+        if docs is None:
+            docs = []
+
+        # Coupe des résultats faibles ; k effectif selon la dispersion des sources
+        final_k = k
+        if self.adaptive_k:
+            docs, final_k = adaptive_cut(docs, k, **self.adaptive_params)
+            if not docs and lexical_docs:
+                final_k = min(self.adaptive_params["base_k"], k)
+
+        if lexical_docs:
+            return self._fuse(docs, lexical_docs, final_k)
+        return docs[:final_k]
+
+    def _search_pinecone(self, query: str, k: int, embedding, categories=None):
+        """Recherche Pinecone (une reconstruction des clients si échec), None si indisponible"""
+        # Filtre de métadonnées posé à l'ingestion (category = CODES / REF / DOC)
+        metadata_filter = {"category": {"$in": list(categories)}} if categories else None
+        for attempt in (1, 2):
+            try:
+                if embedding is None or attempt == 2:
+                    embedding = self.embed_query(query)
+                hits = self._pool.vectorstore().similarity_search_by_vector_with_score(
+                    embedding, k=k, filter=metadata_filter
+                )
+                for doc, score in hits:
+                    doc.metadata['score'] = float(score)
+                return [doc for doc, _ in hits]
+            except Exception as e:
+                logger.error(f"IAService: Erreur lors de la recherche Pinecone : {e}")
+                # Connexion probablement cassée : on reconstruit les clients une fois
+                self._pool.reset("embeddings", "index")
+        return None
+
+    def _search_lexical(self, query: str, categories=None):
+        """Chunks classés par BM25 (références d'articles, sigles), [] si pas d'export"""
+        local_index = get_local_index(self.local_index_dir)
+        if local_index is None:
+            return []
+        lexical_index = get_lexical_index(local_index)
+        if lexical_index is None:
+            return []
+        row_mask = local_index.category_mask(categories) if categories else None
+        return [
+            self._local_document(local_index, row, score)
+            for row, score in lexical_index.search(query, self.hybrid_candidates, row_mask)
+        ]
+
+    def _fuse(self, vector_docs, lexical_docs, k: int):
+        """Fusion RRF des deux classements (un chunk = même texte des deux côtés)"""
+        def key(doc):
+            return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+        by_key = {}
+        for doc in list(vector_docs) + list(lexical_docs):
+            by_key.setdefault(key(doc), doc)
+        fused = reciprocal_rank_fusion(
+            [[key(d) for d in vector_docs], [key(d) for d in lexical_docs]], k=self.rrf_k
         )
+        return [by_key[doc_key] for doc_key, _ in fused[:k]]
+
+    @staticmethod
+    def _local_document(local_index, row: int, score: float):
+        chunk = local_index.chunks[row]
+        metadata = dict(chunk["metadata"], id=chunk["id"], score=score)
+        return Document(page_content=chunk["text"], metadata=metadata)
 
-    def search_documents(self, query: str, k: int = None):
-        """Recherche les documents pertinents dans Pinecone"""
+    def _search_local(self, query: str, k: int, embedding, categories=None):
+        """Recherche dans l'index NumPy exporté par rebuild_base.py, None si absent"""
+        local_index = get_local_index(self.local_index_dir)
+        if local_index is None:
+            return None
         try:
-            # ✅ RÉTABLISSEMENT DE VOTRE SYNTAXE PRÉCISE :
-            embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/gemini-embedding-001", 
-                google_api_key=self.google_api_key,
-                task_type="retrieval_query"
-            )
-            
-            vectorstore = PineconeVectorStore(
-                index_name=self.index_name,
-                embedding=embeddings,
-                pinecone_api_key=self.pinecone_api_key
-            )
-            
-            docs = vectorstore.similarity_search(query, k=k)
-            
-            # ✅ Application du nettoyage centralisé sur chaque document trouvé
-            for doc in docs:
-                raw_path = doc.metadata.get('source', 'Inconnu')
-                category = doc.metadata.get('category', 'AUTRE')
-                # Utilisation de la fonction importée de utils.helpers
-                doc.metadata['clean_name'] = clean_source_name(raw_path, category)
-                
-            return docs
-            
+            if embedding is None:
+                embedding = self.embed_query(query)
+            row_mask = local_index.category_mask(categories) if categories else None
+            hits = local_index.search(embedding, k=k or 8, row_mask=row_mask)
         except Exception as e:
-            logger.error(f"IAService: Erreur lors de la recherche Pinecone : {e}")
-            return []
+            logger.error(f"IAService: Erreur lors de la recherche locale : {e}")
+            return None
+
+        return [self._local_document(local_index, row, score) for row, score in hits]
 
-    # ✅ Note : La fonction clean_source_name_internal a été SUPPRIMÉE 
-    # pour respecter la règle de non-duplication du code.
\ No newline at end of file
+    # ✅ Note : La fonction clean_source_name_internal a été SUPPRIMÉE
+    # pour respecter la règle de non-duplication du code.
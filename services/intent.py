@@ -0,0 +1,68 @@
+"""
+==============================================================================
+INTENT - CLASSIFICATION LOCALE DE LA DEMANDE (CALCUL / RÈGLE / COURRIER / AUDIT)
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import re
+
+from rules.calculators import extract_parameters
+from rules.engine import normalize_text
+from services.lexical_index import ARTICLE_RE
+
+# Intentions reconnues (clés des modules de prompt et des plafonds de sortie)
+INTENT_CALCULATION = "calcul"
+INTENT_QUALITATIVE = "regle"
+INTENT_LETTER = "courrier"
+INTENT_AUDIT = "audit"
+
+INTENTS = (INTENT_CALCULATION, INTENT_QUALITATIVE, INTENT_LETTER, INTENT_AUDIT)
+
+# Indices lexicaux (mots normalisés)
+_LETTER_TERMS = frozenset({
+    "redige", "rediger", "redaction", "lettre", "courrier", "mail", "email", "modele",
+    "convocation", "notification", "notifier", "avertissement", "attestation", "ecrire"
+})
+_AUDIT_TERMS = frozenset({
+    "audit", "auditer", "verifie", "verifier", "controle", "controler", "bulletin",
+    "fiche", "anomalie", "anomalies", "conforme", "conformite", "erreur", "erreurs"
+})
+_CALCULATION_TERMS = frozenset({
+    "calcul", "calcule", "calculer", "combien", "montant", "simule", "simuler",
+    "simulation", "net", "brut", "cout", "indemnite", "total"
+})
+
+# Chiffres qui ne sont pas des paramètres : années ("SMIC 2026"), articles
+_NOT_PARAMETER_RE = re.compile(r"\b(?:19|20)\d{2}\b|" + ARTICLE_RE.pattern)
+_DIGIT_RE = re.compile(r"\d")
+
+
+def classify_intent(query: str, has_user_doc: bool = False) -> str:
+    """
+    Classe la demande pour choisir les modules du prompt (aucun appel réseau).
+    - Courrier : demande de rédaction (prioritaire, même avec un document)
+    - Audit : document utilisateur fourni, ou vocabulaire de contrôle
+    - Calcul : paramètres chiffrés reconnus par les calculateurs, chiffres
+      (hors années et numéros d'articles), ou vocabulaire de calcul
+    - Règle : le reste (question qualitative)
+
+    Args:
+        query: Question de l'utilisateur
+        has_user_doc: Un document utilisateur accompagne la question
+
+    Returns:
+        Une des valeurs de INTENTS
+    """
+    query = query or ""
+    terms = set(normalize_text(query).split())
+    has_numbers = bool(_DIGIT_RE.search(_NOT_PARAMETER_RE.sub(" ", query)))
+
+    if terms & _LETTER_TERMS:
+        return INTENT_LETTER
+    if has_user_doc or terms & _AUDIT_TERMS:
+        return INTENT_AUDIT
+    if terms & _CALCULATION_TERMS or has_numbers or extract_parameters(query):
+        return INTENT_CALCULATION
+    return INTENT_QUALITATIVE
@@ -0,0 +1,178 @@
+"""
+==============================================================================
+LEXICAL INDEX - BM25 SUR LES CHUNKS + FUSION RRF AVEC LE VECTORIEL
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import json
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rules.bm25 import BM25Index
+from rules.engine import normalize_text
+from utils.helpers import logger, shared_instance
+
+# Références d'articles de code : L1234-9, L. 1237-19, R1234-2, D5122-13...
+ARTICLE_RE = re.compile(r"(?<![A-Za-z0-9])([LRDlrd])\s?\.?\s?(\d{3,4}(?:-\d+){1,2})(?![\d-])")
+
+
+def extract_article_ids(text: str) -> List[str]:
+    """
+    Extrait les identifiants d'articles cités, normalisés ("L1234-9").
+
+    Args:
+        text: Texte brut (chunk, question ou source YAML)
+
+    Returns:
+        Identifiants uniques, dans l'ordre d'apparition
+    """
+    if not text:
+        return []
+    seen: Dict[str, None] = {}
+    for letter, number in ARTICLE_RE.findall(text):
+        seen.setdefault(f"{letter.upper()}{number}", None)
+    return list(seen)
+
+
+def lexical_tokens(text: str) -> Tuple[List[str], List[str]]:
+    """
+    Tokens BM25 d'un texte : références d'articles (pondérées comme des
+    mots-clés) et mots normalisés comme dans le moteur de règles.
+    """
+    article_tokens = [article_id.lower() for article_id in extract_article_ids(text)]
+    word_tokens = [w for w in normalize_text(text).split() if len(w) >= 2]
+    return article_tokens, word_tokens
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fusionne plusieurs classements par Reciprocal Rank Fusion.
+
+    Args:
+        rankings: Classements (identifiants du meilleur au moins bon)
+        k: Constante d'amortissement RRF (60 = valeur usuelle)
+
+    Returns:
+        Couples (identifiant, score RRF) par score décroissant, premier
+        classement prioritaire en cas d'égalité
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    order = {item: i for i, item in enumerate(scores)}
+    return sorted(scores.items(), key=lambda pair: (-pair[1], order[pair[0]]))
+
+
+class LexicalIndex:
+    """
+    Index BM25 des chunks de l'index local (mêmes lignes que chunks.jsonl).
+    Couvre ce que l'embedding rate : numéros d'articles, sigles (APLD, PPV).
+    """
+
+    # Matrice CSR (NumPy, sans pickle) + vocabulaire et positions (JSON)
+    ARRAYS_FILE = "lexical.npz"
+    META_FILE = "lexical.json"
+    # Ancien export (pickle), supprimé au prochain export
+    LEGACY_FILE = "lexical.pickle"
+
+    def __init__(self, bm25: BM25Index, version: str = ""):
+        self.bm25 = bm25
+        self.version = version
+
+    @classmethod
+    def build(cls, texts: Sequence[str], version: str = "") -> "LexicalIndex":
+        """
+        Construit l'index.
+
+        Args:
+            texts: Texte des chunks, dans l'ordre des lignes de l'index local
+            version: Version de l'export local indexé
+        """
+        documents = [(row, *lexical_tokens(text)) for row, text in enumerate(texts)]
+        return cls(BM25Index(documents), version)
+
+    def save(self, directory: str) -> None:
+        """Exporte l'index (données uniquement : rien n'est exécuté au chargement)."""
+        bm25 = self.bm25
+        arrays_tmp = os.path.join(directory, self.ARRAYS_FILE + ".tmp")
+        with open(arrays_tmp, "wb") as f:
+            np.savez(f, indptr=bm25.indptr, indices=bm25.indices, data=bm25.data)
+        vocabulary = sorted(bm25.vocabulary, key=bm25.vocabulary.get)
+        meta_tmp = os.path.join(directory, self.META_FILE + ".tmp")
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": self.version,
+                "vocabulary": vocabulary,
+                "doc_ids": bm25.doc_ids.tolist(),
+            }, f, ensure_ascii=False)
+        # Tableaux d'abord, métadonnées ensuite : la version lue décrit des tableaux complets
+        os.replace(arrays_tmp, os.path.join(directory, self.ARRAYS_FILE))
+        os.replace(meta_tmp, os.path.join(directory, self.META_FILE))
+        legacy = os.path.join(directory, self.LEGACY_FILE)
+        if os.path.exists(legacy):
+            os.remove(legacy)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["LexicalIndex"]:
+        arrays_path = os.path.join(directory, cls.ARRAYS_FILE)
+        meta_path = os.path.join(directory, cls.META_FILE)
+        if not (os.path.exists(arrays_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(arrays_path, allow_pickle=False) as arrays:
+            indptr, indices, data = arrays["indptr"], arrays["indices"], arrays["data"]
+        if indptr.size != len(meta["vocabulary"]) + 1:
+            return None
+        bm25 = BM25Index.from_arrays(meta["doc_ids"], meta["vocabulary"], indptr, indices, data)
+        return cls(bm25, meta.get("version", ""))
+
+    def search(self, query: str, top_n: int = 20,
+               row_mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Chunks les mieux classés par BM25.
+
+        Args:
+            query: Question brute
+            top_n: Nombre maximum de résultats
+            row_mask: Lignes autorisées (filtre de catégories)
+
+        Returns:
+            Couples (ligne du chunk, score) par score décroissant
+        """
+        article_tokens, word_tokens = lexical_tokens(query)
+        scores = self.bm25.scores(article_tokens + word_tokens)
+        if row_mask is not None:
+            scores = np.where(row_mask, scores, 0.0)
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size > top_n:
+            candidates = candidates[np.argpartition(-scores[candidates], top_n - 1)[:top_n]]
+        # Tri stable sur les positions croissantes : ordre d'export en cas d'égalité
+        candidates = np.sort(candidates)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(self.bm25.doc_ids[pos]), float(scores[pos])) for pos in order]
+
+
+def get_lexical_index(local_index) -> Optional[LexicalIndex]:
+    """
+    Index BM25 associé à un index local (chargé depuis l'export, ou
+    construit au premier appel si l'export n'en contient pas).
+    """
+    def load() -> Optional[LexicalIndex]:
+        try:
+            index = LexicalIndex.load(local_index.directory)
+            if index is None or index.version != local_index.version:
+                logger.info("Index BM25 absent de l'export : construction en mémoire")
+                index = LexicalIndex.build([c["text"] for c in local_index.chunks], local_index.version)
+            return index
+        except Exception as e:
+            logger.error(f"Index BM25 indisponible : {e}")
+            return None
+
+    return shared_instance(("lexical_index", local_index.directory), load, version=local_index.version)
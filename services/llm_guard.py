@@ -0,0 +1,257 @@
+"""
+==============================================================================
+LLM GUARD - DÉLAIS, REQUÊTE DE COUVERTURE, MODÈLE DE SECOURS, DISJONCTEUR
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.helpers import logger, shared_instance
+
+# Fin de stream d'une tentative
+_DONE = object()
+
+
+class LLMUnavailable(Exception):
+    """Aucun modèle n'a pu répondre dans les délais."""
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur d'un modèle, partagé par toutes les sessions.
+    - Fermé : les requêtes passent
+    - Ouvert après failure_threshold échecs consécutifs (erreur ou premier
+      token hors délai) : le modèle est évité pendant reset_timeout
+    - Semi-ouvert ensuite : une seule requête d'essai, qui referme ou rouvre
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        # Requête d'essai en cours (semi-ouvert), abandonnée au bout de reset_timeout
+        self._trial_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "fermé"
+        if time.time() - self._opened_at >= self.reset_timeout:
+            return "semi-ouvert"
+        return "ouvert"
+
+    def allow(self) -> bool:
+        """Indique si une requête peut partir vers ce modèle."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.time()
+            trial_free = self._trial_started is None or now - self._trial_started >= self.reset_timeout
+            if now - self._opened_at >= self.reset_timeout and trial_free:
+                self._trial_started = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"LLM: disjoncteur '{self.name}' refermé")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_started is not None or (
+                self._opened_at is None and self._failures >= self.failure_threshold
+            ):
+                logger.warning(f"LLM: disjoncteur '{self.name}' ouvert ({self._failures} échecs consécutifs)")
+                self._opened_at = time.time()
+            self._trial_started = None
+
+
+class _Attempt:
+    """Un stream lancé en arrière-plan ; ses chunks passent par la file partagée."""
+
+    def __init__(self, model: str, factory: Callable[[], Iterator[str]], events: queue.Queue):
+        self.model = model
+        self.factory = factory
+        self.cancelled = threading.Event()
+        self._events = events
+
+    def run(self) -> None:
+        try:
+            for chunk in self.factory():
+                if self.cancelled.is_set():
+                    return
+                self._events.put((self, chunk))
+            self._events.put((self, _DONE))
+        except Exception as e:
+            self._events.put((self, e))
+
+
+class GenerationGuard:
+    """
+    Encadre le stream du LLM pour tenir une latence prévisible :
+    - Délai du premier token (ttft_timeout) : au-delà, une requête de
+      couverture identique part en parallèle et la première qui répond gagne
+    - Échec du modèle principal : bascule sur le modèle de secours
+    - Échéance globale (total_timeout) : la génération est abandonnée
+    - Disjoncteur par modèle : un fournisseur dégradé est évité par toutes
+      les sessions au lieu de les ralentir chacune
+    """
+
+    def __init__(self, ttft_timeout: float = 8.0, total_timeout: float = 90.0, hedge: bool = True,
+                 failure_threshold: int = 3, reset_timeout: float = 30.0, max_workers: int = 32):
+        self.ttft_timeout = ttft_timeout
+        self.total_timeout = total_timeout
+        self.hedge = hedge
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(model, self.failure_threshold, self.reset_timeout)
+            return self._breakers[model]
+
+    def breaker_states(self) -> Dict[str, str]:
+        """État des disjoncteurs (debug admin)."""
+        return {model: breaker.state for model, breaker in self._breakers.items()}
+
+    def stream(self, attempts: Sequence[Tuple[str, Callable[[], Iterator[str]]]]) -> Iterator[str]:
+        """
+        Stream de la réponse avec délais, couverture et secours.
+
+        Args:
+            attempts: Couples (modèle, fabrique du stream) par ordre de
+                préférence : principal puis secours
+
+        Yields:
+            Chunks de texte de la tentative retenue
+
+        Raises:
+            LLMUnavailable: Aucun modèle disponible ou échéance dépassée
+            Exception: Erreur du modèle après le début de la réponse
+        """
+        started = time.perf_counter()
+        deadline = started + self.total_timeout
+        events: queue.Queue = queue.Queue()
+        pending: List[Tuple[str, Callable[[], Iterator[str]]]] = list(attempts)
+        running: List[_Attempt] = []
+        stalled: List[_Attempt] = []
+        hedged = False
+
+        def launch(model: str, factory: Callable[[], Iterator[str]]) -> _Attempt:
+            attempt = _Attempt(model, factory, events)
+            running.append(attempt)
+            self._executor.submit(attempt.run)
+            return attempt
+
+        def launch_next() -> bool:
+            while pending:
+                model, factory = pending.pop(0)
+                if self.breaker(model).allow():
+                    launch(model, factory)
+                    return True
+                logger.warning(f"LLM: disjoncteur '{model}' ouvert, modèle ignoré")
+            return False
+
+        if not launch_next():
+            raise LLMUnavailable("Tous les modèles sont indisponibles (disjoncteurs ouverts)")
+
+        winner: Optional[_Attempt] = None
+        try:
+            # 1. Premier token : couverture si le modèle tarde, secours s'il échoue
+            ttft_deadline = min(started + self.ttft_timeout, deadline)
+            while winner is None:
+                now = time.perf_counter()
+                if now >= deadline:
+                    for attempt in running:
+                        if attempt not in stalled:
+                            self.breaker(attempt.model).record_failure()
+                    raise LLMUnavailable(f"Aucun premier token en {self.total_timeout:.0f} s")
+                if now >= ttft_deadline:
+                    # Chaque tentative lente compte une fois comme échec
+                    for attempt in running:
+                        if attempt not in stalled:
+                            stalled.append(attempt)
+                            logger.warning(f"LLM: '{attempt.model}' sans premier token après {now - started:.1f} s")
+                            self.breaker(attempt.model).record_failure()
+                    if self.hedge and not hedged and running:
+                        hedged = True
+                        launch(running[0].model, running[0].factory)
+                    elif not launch_next() and not running:
+                        raise LLMUnavailable("Aucun modèle disponible après dépassement du délai")
+                    ttft_deadline = min(now + self.ttft_timeout, deadline)
+                    continue
+
+                try:
+                    attempt, item = events.get(timeout=ttft_deadline - now)
+                except queue.Empty:
+                    continue
+                if attempt not in running:
+                    continue
+                if isinstance(item, Exception):
+                    running.remove(attempt)
+                    self.breaker(attempt.model).record_failure()
+                    logger.error(f"LLM: échec de '{attempt.model}' : {item}")
+                    if not running and not launch_next():
+                        raise LLMUnavailable(f"Échec de génération : {item}") from item
+                    continue
+
+                winner = attempt
+                if item is _DONE:
+                    self.breaker(winner.model).record_success()
+                    return
+                if winner is not running[0] or hedged:
+                    logger.info(f"LLM: réponse servie par '{winner.model}' (couverture ou secours)")
+                yield item
+
+            for attempt in running:
+                if attempt is not winner:
+                    attempt.cancelled.set()
+
+            # 2. Suite du stream de la tentative retenue, sous l'échéance globale
+            while True:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining <= 0:
+                        raise queue.Empty
+                    attempt, item = events.get(timeout=remaining)
+                except queue.Empty:
+                    self.breaker(winner.model).record_failure()
+                    raise LLMUnavailable(f"Réponse incomplète après {self.total_timeout:.0f} s")
+                if attempt is not winner:
+                    continue
+                if item is _DONE:
+                    self.breaker(winner.model).record_success()
+                    return
+                if isinstance(item, Exception):
+                    self.breaker(winner.model).record_failure()
+                    raise item
+                yield item
+        finally:
+            for attempt in running:
+                attempt.cancelled.set()
+
+
+def get_generation_guard(ttft_timeout: float = 8.0, total_timeout: float = 90.0, hedge: bool = True,
+                         failure_threshold: int = 3, reset_timeout: float = 30.0) -> GenerationGuard:
+    """Retourne la garde partagée par toutes les sessions (disjoncteurs communs)."""
+    return shared_instance("generation_guard", lambda: GenerationGuard(
+        ttft_timeout, total_timeout, hedge, failure_threshold, reset_timeout
+    ))
@@ -0,0 +1,300 @@
+"""
+==============================================================================
+LOCAL VECTOR INDEX - INDEX NUMPY MEMORY-MAPPÉ (IVF) DES CHUNKS
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.helpers import logger, shared_instance
+
+DEFAULT_INDEX_DIR = "local_index/expert-social"
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normalise chaque ligne (similarité cosinus = produit scalaire)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 10,
+            sample_size: int = 20000, seed: int = 0) -> np.ndarray:
+    """
+    K-means sphérique (vecteurs unitaires) sur un échantillon.
+
+    Returns:
+        Centroïdes unitaires (n_clusters × dim)
+    """
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    sample = vectors[np.sort(rng.choice(n, min(n, sample_size), replace=False))]
+    centroids = sample[rng.choice(sample.shape[0], n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=n_clusters)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        non_empty = counts > 0
+        sums = np.add.reduceat(sample[order], starts[non_empty], axis=0)
+        # Un cluster vide garde son centroïde
+        centroids[non_empty] = sums
+        centroids = _unit_rows(centroids)
+
+    return centroids
+
+
+class LocalVectorIndex:
+    """
+    Index vectoriel local, exporté par scripts/rebuild_base.py.
+    - Vecteurs unitaires float32 ou int8 (échelle par ligne) dans un .npy
+      ouvert en memory-mapping : seules les listes sondées sont lues
+    - Partition IVF : les vecteurs sont rangés par cluster k-means, une
+      requête ne parcourt que les nprobe clusters les plus proches
+    - Métadonnées et texte des chunks dans chunks.jsonl (même ordre)
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    SCALES_FILE = "scales.npy"
+    CENTROIDS_FILE = "centroids.npy"
+    OFFSETS_FILE = "offsets.npy"
+    CHUNKS_FILE = "chunks.jsonl"
+    MANIFEST_FILE = "manifest.json"
+
+    # En dessous, une recherche exhaustive est déjà rapide
+    MIN_VECTORS_FOR_IVF = 4096
+
+    def __init__(self, directory: str):
+        """
+        Ouvre un index exporté.
+
+        Args:
+            directory: Dossier de l'index
+        """
+        self.directory = directory
+        with open(self._path(self.MANIFEST_FILE), "r", encoding="utf-8") as f:
+            self.manifest: Dict = json.load(f)
+
+        self.vectors = np.load(self._path(self.VECTORS_FILE), mmap_mode="r")
+        self.scales = np.load(self._path(self.SCALES_FILE)) \
+            if self.manifest.get("dtype") == "int8" else None
+        self.centroids = np.load(self._path(self.CENTROIDS_FILE))
+        self.offsets = np.load(self._path(self.OFFSETS_FILE))
+        self.nprobe = int(self.manifest.get("nprobe", 8))
+
+        self.ids: List[str] = []
+        self.chunks: List[Dict] = []
+        with open(self._path(self.CHUNKS_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                chunk = json.loads(line)
+                self.ids.append(chunk["id"])
+                self.chunks.append(chunk)
+
+        self.row_of: Dict[str, int] = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self.categories = np.array(
+            [chunk["metadata"].get("category", "") for chunk in self.chunks], dtype=object
+        )
+        self._masks: Dict[Tuple[str, ...], np.ndarray] = {}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @property
+    def version(self) -> str:
+        """Empreinte de l'export (change à chaque reconstruction)."""
+        return self.manifest.get("version", "")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, directory: str, ids: Sequence[str], vectors: Sequence[Sequence[float]],
+              texts: Sequence[str], metadatas: Sequence[Dict], model: str = "",
+              quantize: bool = False, n_clusters: Optional[int] = None,
+              nprobe: int = 8) -> "LocalVectorIndex":
+        """
+        Exporte un index (remplace atomiquement l'export précédent).
+
+        Args:
+            directory: Dossier de l'index
+            ids: Identifiant de chaque chunk (mêmes IDs que dans Pinecone)
+            vectors: Embeddings des chunks
+            texts: Texte des chunks
+            metadatas: Métadonnées des chunks (source, category, ...)
+            model: Modèle d'embedding utilisé
+            quantize: Stocke les vecteurs en int8 (4× plus compact)
+            n_clusters: Nombre de listes IVF (√n par défaut, 1 = exhaustif)
+            nprobe: Listes sondées par requête
+
+        Returns:
+            L'index ouvert
+        """
+        matrix = _unit_rows(np.asarray(vectors, dtype=np.float32))
+        n = matrix.shape[0]
+
+        # 1. Partition IVF (vecteurs rangés par cluster)
+        if n_clusters is None:
+            n_clusters = int(np.sqrt(n)) if n >= cls.MIN_VECTORS_FOR_IVF else 1
+        n_clusters = max(1, min(n_clusters, n))
+        if n_clusters > 1:
+            centroids = _kmeans(matrix, n_clusters)
+            assign = np.concatenate([
+                np.argmax(matrix[start:start + 8192] @ centroids.T, axis=1)
+                for start in range(0, n, 8192)
+            ])
+        else:
+            centroids = _unit_rows(matrix.mean(axis=0, keepdims=True)) if n else np.zeros((1, 0), np.float32)
+            assign = np.zeros(n, dtype=np.int64)
+
+        order = np.argsort(assign, kind="stable")
+        offsets = np.zeros(n_clusters + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assign, minlength=n_clusters))
+        matrix = matrix[order]
+
+        # 2. Écriture dans un dossier temporaire puis bascule
+        tmp_dir = directory.rstrip("/") + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        if quantize:
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            np.save(os.path.join(tmp_dir, cls.VECTORS_FILE),
+                    np.round(matrix / scales[:, None]).astype(np.int8))
+            np.save(os.path.join(tmp_dir, cls.SCALES_FILE), scales.astype(np.float32))
+        else:
+            np.save(os.path.join(tmp_dir, cls.VECTORS_FILE), matrix)
+        np.save(os.path.join(tmp_dir, cls.CENTROIDS_FILE), centroids)
+        np.save(os.path.join(tmp_dir, cls.OFFSETS_FILE), offsets)
+
+        digest = hashlib.sha256(model.encode("utf-8"))
+        with open(os.path.join(tmp_dir, cls.CHUNKS_FILE), "w", encoding="utf-8") as f:
+            for row in order:
+                chunk = {"id": ids[row], "text": texts[row], "metadata": dict(metadatas[row])}
+                line = json.dumps(chunk, ensure_ascii=False)
+                digest.update(line.encode("utf-8"))
+                f.write(line + "\n")
+
+        with open(os.path.join(tmp_dir, cls.MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "model": model,
+                "count": int(n),
+                "dim": int(matrix.shape[1]) if n else 0,
+                "dtype": "int8" if quantize else "float32",
+                "n_clusters": int(n_clusters),
+                "nprobe": int(min(nprobe, n_clusters)),
+                "version": digest.hexdigest()[:16],
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }, f, indent=2)
+
+        old_dir = directory.rstrip("/") + ".old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(directory):
+            os.replace(directory, old_dir)
+        os.replace(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        return cls(directory)
+
+    def category_mask(self, categories: Sequence[str]) -> np.ndarray:
+        """Masque booléen des lignes appartenant aux catégories (mémorisé)."""
+        key = tuple(sorted(categories))
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.isin(self.categories, list(key))
+            self._masks[key] = mask
+        return mask
+
+    def _probe_ranges(self, query: np.ndarray, nprobe: int) -> List[Tuple[int, int]]:
+        """Tranches de lignes des listes IVF les plus proches de la requête."""
+        n_lists = self.offsets.size - 1
+        if n_lists <= 1 or nprobe >= n_lists:
+            return [(0, len(self.ids))]
+        closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return [(int(self.offsets[c]), int(self.offsets[c + 1])) for c in np.sort(closest)]
+
+    def search(self, query_vector: Sequence[float], k: int = 8,
+               nprobe: Optional[int] = None,
+               row_mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Recherche les chunks les plus proches (similarité cosinus).
+
+        Args:
+            query_vector: Embedding de la requête
+            k: Nombre de résultats
+            nprobe: Listes IVF sondées (valeur du manifeste par défaut)
+            row_mask: Lignes autorisées (filtre de catégories) ; les listes
+                sondées sont alors doublées pour garder assez de candidats
+
+        Returns:
+            Couples (ligne du chunk, score) par score décroissant
+        """
+        if not self.ids or k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if not norm:
+            return []
+        query = query / norm
+
+        rows: List[np.ndarray] = []
+        scores: List[np.ndarray] = []
+        nprobe = nprobe or self.nprobe
+        if row_mask is not None:
+            nprobe *= 2
+        for start, end in self._probe_ranges(query, nprobe):
+            block_rows = np.arange(start, end)
+            if row_mask is not None:
+                block_rows = block_rows[row_mask[start:end]]
+            if not block_rows.size:
+                continue
+            block = self.vectors[block_rows] if row_mask is not None else self.vectors[start:end]
+            block_scores = block @ query
+            if self.scales is not None:
+                block_scores = block_scores * self.scales[block_rows]
+            rows.append(block_rows)
+            scores.append(block_scores)
+
+        if not rows:
+            return []
+        all_rows = np.concatenate(rows)
+        all_scores = np.concatenate(scores)
+
+        top = min(k, all_scores.size)
+        best = np.argpartition(-all_scores, top - 1)[:top]
+        best = best[np.argsort(-all_scores[best], kind="stable")]
+        return [(int(all_rows[i]), float(all_scores[i])) for i in best]
+
+
+def get_local_index(directory: str = DEFAULT_INDEX_DIR) -> Optional[LocalVectorIndex]:
+    """
+    Retourne l'index local du processus (None s'il n'a pas été exporté).
+    L'index est rouvert si un nouvel export a remplacé le précédent.
+    """
+    manifest = os.path.join(directory, LocalVectorIndex.MANIFEST_FILE)
+    try:
+        signature = os.stat(manifest).st_mtime_ns
+    except OSError:
+        return None
+
+    def load() -> Optional[LocalVectorIndex]:
+        try:
+            index = LocalVectorIndex(directory)
+            logger.info(f"Index local chargé : {len(index)} chunks ({index.manifest.get('dtype')})")
+            return index
+        except Exception as e:
+            logger.error(f"Index local illisible ({directory}) : {e}")
+            return None
+
+    return shared_instance(("local_index", directory), load, version=signature)
@@ -0,0 +1,232 @@
+"""
+==============================================================================
+PROMPT BUILDER - PROMPT EXPERT SOCIAL PRO (MODULES PAR INTENTION)
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import functools
+from typing import Dict, Optional
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from services.intent import (
+    INTENT_AUDIT, INTENT_CALCULATION, INTENT_LETTER, INTENT_QUALITATIVE, INTENTS
+)
+
+# =============================================================================
+# MODULES DU PRÉFIXE STATIQUE : identiques pour toutes les questions d'un
+# snapshot de règles et d'une intention ({vital_facts} injecté une fois)
+# =============================================================================
+PERSONA_MODULE = """Tu es l'Expert Social Pro 2026, spécialiste de l'audit paie et du droit social français.
+"""
+
+SOURCES_MODULE = """=== RÈGLE ABSOLUE : HIÉRARCHIE DES SOURCES ===
+🚨 AVANT TOUTE RÉPONSE, LIS LES FAITS CERTIFIÉS (PERMANENTS CI-DESSOUS ET PROPRES À LA QUESTION).
+🚨 LES CHIFFRES DU YAML ÉCRASENT TA CONNAISSANCE INTERNE ET LE CONTEXTE RAG.
+
+FAITS CERTIFIÉS PERMANENTS (YAML - SOURCE PRIORITAIRE ABSOLUE) :
+{vital_facts}
+
+⚠️ EXEMPLES D'ARBITRAGE OBLIGATOIRES :
+- Forfait social rupture conventionnelle = 40,0% (YAML), PAS 20% (taux standard).
+- Télétravail 3 jours/semaine = 33,00 €/mois (11 € × 3), PAS un autre calcul.
+- SMIC 2026 = 1 823,03 €/mois, PAS une ancienne valeur.
+- Indemnité légale licenciement = 1/4 mois (0,2500) jusqu'à 10 ans, puis 1/3 (0,3333).
+"""
+
+CALCULATION_MODULE = """=== RÈGLE ABSOLUE : MÉTHODE DE CALCUL AUDIT ===
+A. INTERDICTIONS FORMELLES :
+   ❌ Convertir les mois en années décimales (ex: écrire "2,75 ans" est INTERDIT).
+   ❌ Donner un résultat sans montrer chaque étape intermédiaire.
+   ❌ Arrondir les calculs intermédiaires à moins de 4 décimales.
+   ❌ Inventer des chiffres non présents dans les sources.
+
+B. MÉTHODE OBLIGATOIRE :
+   ✅ Ancienneté fractionnaire : 12 ans et 9 mois = 12 + (9/12).
+   ✅ Coefficients : Utilise 4 décimales avec arrondi rigoureux (ex: 1/3 = 0,3333 | 2,75/3 = 0,9167).
+   ✅ Résultat final : 2 décimales avec les deux zéros (ex: 15 000,00 EUR).
+
+C. EXCEPTION DE JUSTESSE (PRIORITÉ MAXIMALE) :
+   🎯 AVANT d'appliquer un coefficient (0,2500 ou 0,3333), VÉRIFIE si la division tombe juste :
+   - 4800 ÷ 4 = 1200 (JUSTE) → Utilise 1 200,00 EUR, PAS 4800 × 0,2500
+   - 4800 ÷ 3 = 1600 (JUSTE) → Utilise 1 600,00 EUR, PAS 4800 × 0,3333
+   - 5000 ÷ 3 = 1666,6667 (PAS JUSTE) → Utilise 5000 × 0,3333 = 1 666,50 EUR
+
+D. EXEMPLE DE RÉFÉRENCE (PRÉCISION CHIRURGICALE) :
+   - Salaire : 4 800,00 EUR | Ancienneté : 12 ans et 9 mois
+   - Tranche 1 (10 ans) : 4800 ÷ 4 = 1200 (JUSTE) → 10 × 1 200 = 12 000,00 EUR
+   - Tranche 2 (2 ans 9 mois) : 4800 ÷ 3 = 1600 (JUSTE) → (2 + 9/12) × 1 600 = 2,75 × 1 600 = 4 400,00 EUR
+   - TOTAL : 12 000,00 + 4 400,00 = 16 400,00 EUR
+"""
+
+AUDIT_MODULE = """=== RÈGLE ABSOLUE : AUDIT DE DOCUMENT ===
+- Contrôle le document utilisateur ligne par ligne contre les faits certifiés (taux, plafonds, assiettes).
+- Pour chaque écart : valeur du document, valeur attendue, écart chiffré, source.
+- Signale les mentions obligatoires absentes.
+- Ne conclus à une anomalie que si la règle applicable figure dans les sources.
+"""
+
+LETTER_MODULE = """=== RÈGLE ABSOLUE : RÉDACTION DE COURRIER ===
+- Courrier prêt à l'emploi : expéditeur, destinataire, lieu et date, objet, corps, formule de politesse, signature.
+- Champs à compléter entre crochets : [Nom du salarié], [Date de l'entretien]...
+- Délais et mentions obligatoires conformes aux sources, cités dans les points de vigilance.
+- Ton professionnel et neutre ; aucun montant absent des faits certifiés.
+"""
+
+FORMAT_MODULE = """=== RÈGLE ABSOLUE : FORMAT DE RÉPONSE ===
+- Silence technique : Pas de politesses ("Bonjour", "Bien sûr", "Je vous en prie").
+- Markdown strict : ### Titres, **Gras**, - Listes.
+- Nomenclature des sources (OBLIGATOIRE après chaque chiffre) :
+  * BOSS -> (BOSS 2026 - [THÉMATIQUE])
+  * Code du Travail -> (Code du Travail Art. L1234-5)
+  * Code Sécurité Sociale -> (CSS Art. L136-8)
+  * YAML -> (Barème officiel 2026)
+"""
+
+# Modules du préfixe par intention (la méthode de calcul n'est envoyée
+# qu'aux calculs et aux audits)
+INTENT_MODULES = {
+    INTENT_CALCULATION: (PERSONA_MODULE, SOURCES_MODULE, CALCULATION_MODULE, FORMAT_MODULE),
+    INTENT_QUALITATIVE: (PERSONA_MODULE, SOURCES_MODULE, FORMAT_MODULE),
+    INTENT_LETTER: (PERSONA_MODULE, SOURCES_MODULE, LETTER_MODULE),
+    INTENT_AUDIT: (PERSONA_MODULE, SOURCES_MODULE, CALCULATION_MODULE, AUDIT_MODULE, FORMAT_MODULE),
+}
+
+# =============================================================================
+# SUFFIXE PAR REQUÊTE : date, faits propres à la question, contexte, question,
+# puis rappel et plan de réponse de l'intention
+# =============================================================================
+REQUEST_HEADER = """=== CONTEXTE TEMPOREL ===
+📅 Date du jour : {current_date}
+📅 Année de référence des barèmes : 2026
+
+=== FAITS CERTIFIÉS PROPRES À LA QUESTION (YAML - SOURCE PRIORITAIRE ABSOLUE) ===
+{certified_facts}
+
+=== CONTEXTE DOCUMENTAIRE (PRIORITÉ 2 - APRÈS YAML) ===
+{context}
+
+=== DOCUMENT UTILISATEUR (SI FOURNI) ===
+{user_doc_section}
+
+"""
+
+_REMINDER_SOURCES = """✅ TAUX/MONTANTS -> YAML uniquement (ignore ta mémoire interne).
+"""
+_REMINDER_CALCULATION = """✅ ANCIENNETÉ -> Fractions (9/12), JAMAIS décimales (2,75).
+✅ COEFFICIENTS -> 4 décimales (0,9167) SAUF si division exacte (1600).
+"""
+_REMINDER_END = """✅ CITATIONS -> Chaque chiffre doit avoir sa source entre parenthèses.
+✅ SI AUCUNE INFO DISPONIBLE -> Dis clairement "Cette information n'est pas dans mes sources."
+"""
+
+_SOURCES_LINE = "Sources utilisées : [Liste des sources entre parenthèses]\n"
+
+INTENT_PLANS = {
+    INTENT_CALCULATION: """### ANALYSE & RÈGLES
+[Explique les règles applicables avec leurs sources]
+
+### DÉTAIL & CHIFFRES
+[Montre chaque étape de calcul si nécessaire]
+
+### RÉSULTAT
+[Donne la réponse finale claire et concise]
+
+""",
+    INTENT_QUALITATIVE: """### ANALYSE & RÈGLES
+[Explique les règles applicables, leurs conditions et leurs sources]
+
+### RÉPONSE
+[Donne la réponse finale claire et concise]
+
+""",
+    INTENT_LETTER: """### COURRIER
+[Texte complet du courrier, champs à compléter entre crochets]
+
+### POINTS DE VIGILANCE
+[Délais, mentions obligatoires et procédure, avec leurs sources]
+
+""",
+    INTENT_AUDIT: """### SYNTHÈSE DE L'AUDIT
+[Conformité globale en quelques lignes]
+
+### ANOMALIES DÉTECTÉES
+[Pour chaque écart : valeur du document, valeur attendue, écart chiffré, source]
+
+### RECALCULS
+[Étapes de calcul des montants corrigés]
+
+### RECOMMANDATIONS
+[Corrections à apporter]
+
+""",
+}
+
+
+def _request_template(intent: str) -> str:
+    """Suffixe de la requête pour une intention."""
+    reminder = _REMINDER_SOURCES
+    if CALCULATION_MODULE in INTENT_MODULES[intent]:
+        reminder += _REMINDER_CALCULATION
+    reminder += _REMINDER_END
+    return (
+        REQUEST_HEADER
+        + "=== RAPPEL FINAL AVANT DE RÉPONDRE (VÉRIFICATION D'AUDIT) ===\n"
+        + reminder
+        + "\nQUESTION : {question}\n\nRÉPONDS STRICTEMENT SELON CE PLAN :\n"
+        + INTENT_PLANS[intent]
+        + _SOURCES_LINE
+    )
+
+
+# ✅ Compilés une fois à l'import (plus de from_template à chaque question)
+# Préfixe statique en instruction système, en tête de chaque requête : partie
+# stable que le cache implicite de préfixe du fournisseur peut réutiliser
+PROMPTS = {
+    intent: ChatPromptTemplate.from_messages([
+        ("system", "{static_prefix}"),
+        ("human", _request_template(intent)),
+    ])
+    for intent in INTENTS
+}
+
+
+@functools.lru_cache(maxsize=32)
+def build_static_prefix(vital_facts: str, intent: str = INTENT_CALCULATION) -> str:
+    """
+    Texte du préfixe statique pour un snapshot de règles et une intention
+    (construit une fois par couple, identique d'une question à l'autre).
+
+    Args:
+        vital_facts: Faits des règles vitales (engine.format_vital_facts())
+        intent: Intention de la demande (services.intent.classify_intent())
+    """
+    modules = INTENT_MODULES.get(intent, INTENT_MODULES[INTENT_CALCULATION])
+    return "\n".join(modules).replace("{vital_facts}", vital_facts)
+
+
+def build_chain(llm, intent: str = INTENT_CALCULATION, max_output_tokens: Optional[int] = None):
+    """
+    Chaîne de génération pour une intention.
+
+    Args:
+        llm: Client Gemini (IAService.get_llm())
+        intent: Intention de la demande (plan de réponse)
+        max_output_tokens: Plafond de tokens générés pour cette intention
+
+    Returns:
+        Runnable à alimenter avec prompt_inputs()
+    """
+    if intent not in INTENT_MODULES:
+        intent = INTENT_CALCULATION
+    if max_output_tokens:
+        llm = llm.bind(generation_config={"max_output_tokens": max_output_tokens})
+    return PROMPTS[intent] | llm | StrOutputParser()
+
+
+def prompt_inputs(static_prefix: str, **request_values: str) -> Dict[str, str]:
+    """Variables de la chaîne : préfixe statique + suffixe de la requête."""
+    return dict(request_values, static_prefix=static_prefix)
@@ -0,0 +1,95 @@
+"""
+==============================================================================
+QUERY ROUTER - CATÉGORIES DE CHUNKS À INTERROGER (CODES / REF / DOC)
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+from rules.engine import normalize_text
+from services.lexical_index import extract_article_ids
+
+# Catégories posées à l'ingestion (scripts/rebuild_base.py)
+CATEGORIES = ("CODES", "REF", "DOC")
+
+# Indices lexicaux (mots normalisés) par catégorie
+_CODES_TERMS = frozenset({"article", "articles", "code", "legislatif", "reglementaire", "loi"})
+_REF_TERMS = frozenset({
+    "bareme", "baremes", "taux", "plafond", "plafonds", "montant", "smic", "pass",
+    "cotisation", "cotisations", "forfait", "exoneration", "exonere", "urssaf",
+    "boss", "combien", "calcul", "calculer", "net", "brut"
+})
+_DOC_TERMS = frozenset({
+    "jurisprudence", "cassation", "arret", "arrets", "prudhommes", "prud",
+    "tribunal", "conseil", "contentieux", "decision"
+})
+
+# Sources YAML -> catégorie de chunks correspondante
+_SOURCE_HINTS = (
+    ("code", "CODES"),
+    ("boss", "REF"),
+    ("bareme", "REF"),
+    ("urssaf", "REF"),
+)
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """Catégories à interroger en priorité (vide = index complet)."""
+    categories: Tuple[str, ...]
+    reason: str
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.categories)
+
+
+def route_query(query: str, rule_sources: Sequence[str] = ()) -> RouteDecision:
+    """
+    Choisit les catégories de chunks pertinentes pour une question.
+    - Citation d'article -> CODES
+    - Question de barème / taux / montant -> REF
+    - Jurisprudence -> DOC
+    - Sources des règles YAML spécifiques matchées (Code du Travail -> CODES,
+      BOSS / barème -> REF)
+    Si rien ne ressort, ou si tout ressort, l'index complet est interrogé.
+
+    Args:
+        query: Question de l'utilisateur
+        rule_sources: Champ source des règles spécifiques matchées
+
+    Returns:
+        RouteDecision
+    """
+    terms = set(normalize_text(query).split())
+    selected: List[str] = []
+    reasons: List[str] = []
+
+    def add(category: str, reason: str) -> None:
+        if category not in selected:
+            selected.append(category)
+            reasons.append(reason)
+
+    if extract_article_ids(query) or terms & _CODES_TERMS:
+        add("CODES", "citation d'article")
+    if terms & _REF_TERMS:
+        add("REF", "barème")
+    if terms & _DOC_TERMS:
+        add("DOC", "jurisprudence")
+
+    for source in rule_sources:
+        normalized_source = normalize_text(source)
+        for hint, category in _SOURCE_HINTS:
+            if hint in normalized_source:
+                add(category, f"règle YAML ({source})")
+                break
+
+    if not selected or len(selected) == len(CATEGORIES):
+        return RouteDecision((), "index complet")
+
+    # Ordre canonique : la clé de filtre reste stable d'une question à l'autre
+    ordered = tuple(category for category in CATEGORIES if category in selected)
+    return RouteDecision(ordered, ", ".join(reasons))
@@ -0,0 +1,157 @@
+"""
+==============================================================================
+RETRIEVAL ORCHESTRATOR - ÉTAPES DE RECHERCHE EN PARALLÈLE
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.helpers import logger, shared_instance
+
+
+def adaptive_cut(docs: Sequence, k_max: int, base_k: int = 4, min_score: float = 0.55,
+                 max_drop: float = 0.12, max_gap: float = 0.06,
+                 spread_sources: int = 3) -> Tuple[List, int]:
+    """
+    Top-k adaptatif sur des résultats vectoriels classés (score de similarité
+    dans metadata["score"]).
+    - Écarte les résultats sous le seuil absolu min_score
+    - S'arrête quand le score décroche : plus de max_drop sous le meilleur,
+      ou un écart de plus de max_gap entre deux résultats consécutifs
+    - Garde base_k résultats, et monte à k_max seulement si les premiers
+      résultats couvrent au moins spread_sources sources distinctes
+
+    Args:
+        docs: Documents classés par score décroissant
+        k_max: Nombre maximum de documents
+        base_k, min_score, max_drop, max_gap, spread_sources: Seuils calibrés
+            hors ligne (voir scripts/calibrate_retrieval.py)
+
+    Returns:
+        Tuple (documents retenus, k effectif)
+    """
+    scores = [d.metadata.get("score") for d in docs]
+    if any(score is None for score in scores):
+        return list(docs[:k_max]), k_max
+
+    kept: List = []
+    for doc, score in zip(docs, scores):
+        if score < min_score:
+            break
+        if kept and (score < scores[0] - max_drop or scores[len(kept) - 1] - score > max_gap):
+            break
+        kept.append(doc)
+
+    head = kept[:base_k]
+    n_sources = len({d.metadata.get("source") for d in head})
+    k = k_max if n_sources >= spread_sources else min(base_k, k_max)
+    return kept[:k], k
+
+
+class RetrievalStage:
+    """Étape lancée en arrière-plan, lue au plus tard à son échéance."""
+
+    def __init__(self, name: str, future: Future, deadline: float, default: Any, started: float):
+        self.name = name
+        self.default = default
+        self._future = future
+        self._deadline = deadline
+        self._started = started
+        self.elapsed: Optional[float] = None
+        self.status = "running"
+
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, _future: Future) -> None:
+        self.elapsed = time.perf_counter() - self._started
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def result(self) -> Any:
+        """
+        Résultat de l'étape, ou sa valeur par défaut si elle a échoué ou
+        n'est pas prête à son échéance (elle continue alors en arrière-plan).
+        """
+        remaining = max(0.0, self._deadline - time.perf_counter())
+        try:
+            value = self._future.result(timeout=remaining)
+            self.status = "ok"
+            return value
+        except FutureTimeout:
+            self.status = "timeout"
+            logger.warning(f"Retrieval: étape '{self.name}' hors délai, valeur par défaut utilisée")
+        except Exception as e:
+            self.status = "error"
+            logger.error(f"Retrieval: étape '{self.name}' en échec : {e}")
+        return self.default
+
+
+class RetrievalRun:
+    """
+    Étapes d'une question. Chaque étape a son propre délai, borné par
+    l'échéance globale de la recherche.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, deadline: float):
+        self._executor = executor
+        self._started = time.perf_counter()
+        self._deadline = self._started + deadline
+        self.stages: Dict[str, RetrievalStage] = {}
+
+    def submit(self, name: str, fn: Callable[[], Any], timeout: Optional[float] = None,
+               default: Any = None) -> RetrievalStage:
+        """
+        Lance une étape.
+
+        Args:
+            name: Nom de l'étape (logs, timings)
+            fn: Travail à exécuter (sans appel Streamlit)
+            timeout: Délai propre à l'étape (secondes)
+            default: Valeur rendue si l'étape échoue ou dépasse son délai
+
+        Returns:
+            Étape à lire avec result()
+        """
+        deadline = self._deadline
+        if timeout is not None:
+            deadline = min(deadline, time.perf_counter() + timeout)
+        stage = RetrievalStage(name, self._executor.submit(fn), deadline, default, time.perf_counter())
+        self.stages[name] = stage
+        return stage
+
+    def timings(self) -> Dict[str, str]:
+        """Durée ou statut de chaque étape (debug admin)."""
+        return {
+            name: f"{stage.elapsed * 1000:.0f} ms" if stage.elapsed is not None else stage.status
+            for name, stage in self.stages.items()
+        }
+
+
+class RetrievalOrchestrator:
+    """
+    Pool de threads du processus pour les étapes réseau de la recherche
+    (embedding, Pinecone, version de l'index). Les étapes d'une question
+    partent en même temps au lieu de s'enchaîner.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retrieval")
+
+    def start(self, deadline: float) -> RetrievalRun:
+        """
+        Ouvre la recherche d'une question.
+
+        Args:
+            deadline: Temps maximum accordé à la recherche (secondes)
+        """
+        return RetrievalRun(self._executor, deadline)
+
+
+def get_retrieval_orchestrator(max_workers: int = 8) -> RetrievalOrchestrator:
+    """Retourne l'orchestrateur partagé par toutes les sessions du processus."""
+    return shared_instance("retrieval_orchestrator", lambda: RetrievalOrchestrator(max_workers))
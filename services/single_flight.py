@@ -0,0 +1,152 @@
+"""
+==============================================================================
+SINGLE FLIGHT - UNE SEULE GÉNÉRATION POUR LES QUESTIONS IDENTIQUES EN COURS
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import hashlib
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from rules.engine import normalize_text
+from utils.helpers import logger, shared_instance
+
+
+def flight_key(question: str, snapshot: str) -> str:
+    """
+    Clé de regroupement : question normalisée + snapshot des règles. Seules
+    les questions sans document utilisateur sont regroupées.
+    """
+    payload = f"{normalize_text(question)}|{snapshot}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Flight:
+    """
+    Génération en cours, diffusée à toutes les sessions qui posent la même
+    question : chaque abonné reçoit tous les chunks depuis le début.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.created = time.time()
+        self.debug_data: List[Dict] = []
+        self.followers = 0
+        self._chunks: List[str] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def relay(self, stream: Iterator[str]) -> Iterator[str]:
+        """
+        Stream du leader : chaque chunk est rendu au leader et publié aux
+        abonnés. Le vol est clos quoi qu'il arrive (fin, erreur, abandon).
+        """
+        try:
+            for chunk in stream:
+                self.publish(chunk)
+                yield chunk
+        except BaseException as e:
+            self.finish(e)
+            raise
+        self.finish()
+
+    def publish(self, chunk: str) -> None:
+        with self._cond:
+            self._chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        with self._cond:
+            if self._done:
+                return
+            self._error = error
+            self._done = True
+            self._cond.notify_all()
+
+    def subscribe(self, timeout: float) -> Iterator[str]:
+        """
+        Chunks de la génération, depuis le premier.
+
+        Args:
+            timeout: Attente maximale sans nouveau chunk (secondes)
+
+        Raises:
+            TimeoutError: Le leader ne publie plus
+            RuntimeError: La génération du leader a échoué
+        """
+        position = 0
+        while True:
+            with self._cond:
+                if position >= len(self._chunks) and not self._done:
+                    if not self._cond.wait_for(
+                        lambda: position < len(self._chunks) or self._done, timeout=timeout
+                    ):
+                        raise TimeoutError("Génération partagée sans nouvelle donnée")
+                chunks = self._chunks[position:]
+                done, error = self._done, self._error
+            for chunk in chunks:
+                yield chunk
+            position += len(chunks)
+            if done and position >= len(self._chunks):
+                if error is not None:
+                    raise RuntimeError(f"Génération partagée en échec : {error}")
+                return
+
+
+class SingleFlight:
+    """
+    Registre des générations en cours du processus. La première session qui
+    pose une question devient leader (recherche + génération) ; les suivantes
+    s'abonnent à son stream au lieu de relancer embedding, Pinecone et Gemini.
+    """
+
+    def __init__(self, max_age: float = 120):
+        """
+        Args:
+            max_age: Au-delà, un vol non terminé est considéré comme perdu
+                (session du leader interrompue) et remplacé
+        """
+        self.max_age = max_age
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+        self._coalesced = 0
+
+    def join(self, key: str) -> Tuple[Flight, bool]:
+        """
+        Rejoint le vol de cette clé, ou l'ouvre.
+
+        Returns:
+            Tuple (vol, True si l'appelant est leader)
+        """
+        with self._lock:
+            now = time.time()
+            for stale_key in [k for k, f in self._flights.items()
+                              if f.done or now - f.created > self.max_age]:
+                del self._flights[stale_key]
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self._coalesced += 1
+                logger.info(f"Single-flight: question déjà en cours, {flight.followers} abonné(s)")
+                return flight, False
+
+            flight = Flight(key)
+            self._flights[key] = flight
+            return flight, True
+
+    def stats(self) -> Dict:
+        return {"in_flight": len(self._flights), "coalesced": self._coalesced}
+
+
+def get_single_flight(max_age: float = 120) -> SingleFlight:
+    """Retourne le registre partagé par toutes les sessions du processus."""
+    return shared_instance("single_flight", lambda: SingleFlight(max_age))
@@ -0,0 +1,66 @@
+"""
+==============================================================================
+STREAMING - AFFICHAGE DE LA RÉPONSE EN COURS (RENDU LIMITÉ PAR FRAME)
+VERSION : 4.1
+DATE : 18/10/2026
+==============================================================================
+"""
+
+import time
+from typing import List
+
+
+class StreamRenderer:
+    """
+    Regroupe les chunks du stream avant de redessiner la zone de réponse.
+    Le Markdown complet n'est renvoyé qu'une fois par frame (interval) ou
+    tous les max_chars caractères reçus, au lieu d'une fois par chunk :
+    coût linéaire au lieu de quadratique, et beaucoup moins de deltas
+    websocket pour les réponses longues.
+    """
+
+    def __init__(self, box, interval: float = 0.08, max_chars: int = 400, cursor: str = "▌"):
+        """
+        Args:
+            box: Zone Streamlit (st.empty())
+            interval: Délai minimal entre deux rendus (secondes)
+            max_chars: Caractères reçus qui forcent un rendu avant l'échéance
+            cursor: Curseur affiché pendant le stream
+        """
+        self.box = box
+        self.interval = interval
+        self.max_chars = max_chars
+        self.cursor = cursor
+        self._parts: List[str] = []
+        self._pending_chars = 0
+        self._last_render = time.perf_counter()
+        self.renders = 0
+
+    @property
+    def text(self) -> str:
+        """Texte reçu jusqu'ici."""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def write(self, chunk: str) -> None:
+        """Ajoute un chunk ; redessine si la frame est écoulée."""
+        if not chunk:
+            return
+        self._parts.append(chunk)
+        self._pending_chars += len(chunk)
+        now = time.perf_counter()
+        if now - self._last_render >= self.interval or self._pending_chars >= self.max_chars:
+            self._render(self.text + self.cursor, now)
+
+    def finish(self) -> str:
+        """Rendu final sans curseur (toujours effectué) ; retourne le texte complet."""
+        text = self.text
+        self._render(text, time.perf_counter())
+        return text
+
+    def _render(self, markdown: str, now: float) -> None:
+        self.box.markdown(markdown)
+        self._pending_chars = 0
+        self._last_render = now
+        self.renders += 1
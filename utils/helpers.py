@@ -1,6 +1,7 @@
 import logging
 import re
 import os
+import threading
 
 # --- CONFIGURATION DU LOGGER (RESTAURATION INTÉGRALE) ---
 logging.basicConfig(
@@ -57,4 +58,34 @@ def sanitize_user_input(text, max_length=5000):
         return ""
     # Retire les caractères de contrôle invisibles (sauf sauts de ligne)
     text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', text)
-    return text[:max_length].strip()
\ No newline at end of file
+    return text[:max_length].strip()
+
+# --- INSTANCES PARTAGÉES DU PROCESSUS (CLIENTS, CACHES, INDEX) ---
+_shared_instances = {}
+_shared_locks = {}
+_shared_locks_guard = threading.Lock()
+
+def shared_instance(key, factory, version=None):
+    """
+    Instance partagée par toutes les sessions et tous les threads du
+    processus, construite une seule fois par clé.
+
+    Args:
+        key: Identifiant de l'instance (nom du service + paramètres)
+        factory: Construction, appelée seulement si l'instance est absente
+            ou si sa version a changé (une exception n'est pas mémorisée)
+        version: Version de la source (export, manifeste) ; une nouvelle
+            valeur reconstruit l'instance et remplace l'ancienne
+    """
+    entry = _shared_instances.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    with _shared_locks_guard:
+        lock = _shared_locks.setdefault(key, threading.Lock())
+    # Verrou par clé : une construction lente ne bloque pas les autres services
+    with lock:
+        entry = _shared_instances.get(key)
+        if entry is None or entry[0] != version:
+            entry = (version, factory())
+            _shared_instances[key] = entry
+        return entry[1]